@@ -0,0 +1,510 @@
+# Streaming, structure-aware chunking for RAG ingestion
+#
+# Implements the approach in "3. Chunking Data for RAG":
+#  - input is read line by line, never whole files; a document is a stream
+#    of blocks (headings, paragraphs, fenced code blocks), and a CSV is a
+#    stream of rows
+#  - chunks are built from whole paragraphs up to max_chars; the next chunk
+#    starts with the last ~overlap characters of the previous one, snapped
+#    to a sentence (or word) boundary, and overlap never crosses a heading
+#  - a paragraph longer than max_chars is cut at the last sentence end that
+#    fits, and its pieces are tagged part k of n so they can be rejoined
+#  - every heading opens a section. Chunks carry their section's heading
+#    path ("Intro > Setup") and parent_id; after a section's last chunk a
+#    'section' record lists its children, for parent-child retrieval
+#
+# And "6. Parallel Execution in RAG": chunk_corpus spreads documents over a
+# process pool. A single document is chunked by one worker, since sections
+# and overlap depend on what came before. Only the in-process mode
+# (workers=1) streams end to end: a worker returns a document's chunks as
+# one list, so parallel memory use is bounded by the few documents in
+# flight (about 2 x workers), not by the corpus.
+#
+# Usage: python chunking.py [paths ...] [--workers N] [--out chunks.jsonl]
+#        python chunking.py --benchmark [--synthetic-mb 64] [--workers 1 2 4]
+
+import argparse
+import csv
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_MAX_CHARS = 1000
+DEFAULT_OVERLAP = 150
+TEXT_EXTENSIONS = {'', '.md', '.markdown', '.txt', '.rst'}
+CSV_EXTENSIONS = {'.csv'}
+
+HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+FENCE = re.compile(r'^\s*(```|~~~)')
+SENTENCE_END = re.compile(r'[.!?]["\')\]]*\s+')
+WHITESPACE = re.compile(r'\s+')
+
+
+class Chunk:
+    """
+    One chunk of a document, or (kind='section') the parent record of a
+    section, whose text is its heading and whose children are chunk IDs.
+    """
+
+    __slots__ = ('id', 'kind', 'doc_id', 'parent_id', 'section', 'index', 'heading',
+                 'text', 'offset', 'part', 'parts', 'overlap', 'children')
+
+    def __init__(self, id, kind, doc_id, parent_id, section, index, heading, text,
+                 offset=None, part=None, parts=None, overlap=0, children=None):
+        self.id = id
+        self.kind = kind
+        self.doc_id = doc_id
+        self.parent_id = parent_id
+        self.section = section
+        self.index = index
+        self.heading = heading
+        self.text = text
+        self.offset = offset
+        self.part = part
+        self.parts = parts
+        self.overlap = overlap
+        self.children = children
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__ if getattr(self, name) is not None}
+
+    def __repr__(self):
+        return f"Chunk({self.id!r}, {self.kind}, {len(self.text)} chars)"
+
+
+# Blocks -------------------------------------------------------------------
+
+def iter_blocks(lines):
+    """
+    Split a stream of lines into blocks.
+
+    Yields:
+        (kind, level, text, offset): kind is 'heading' (level 1-6) or
+        'paragraph' (level 0); offset is the block's character offset.
+    """
+    buffer, start, offset, in_fence = [], 0, 0, False
+
+    def paragraph():
+        return ('paragraph', 0, ''.join(buffer).strip('\n').rstrip(), start)
+
+    for line in lines:
+        if in_fence:
+            buffer.append(line)
+            if FENCE.match(line):
+                in_fence = False
+                yield paragraph()
+                buffer = []
+        elif FENCE.match(line):
+            if buffer:
+                yield paragraph()
+            buffer, start, in_fence = [line], offset, True
+        elif not line.strip():
+            if buffer:
+                yield paragraph()
+                buffer = []
+        else:
+            heading = HEADING.match(line)
+            if heading:
+                if buffer:
+                    yield paragraph()
+                    buffer = []
+                yield ('heading', len(heading.group(1)), heading.group(2), offset)
+            else:
+                if not buffer:
+                    start = offset
+                buffer.append(line)
+        offset += len(line)
+    if buffer:
+        yield paragraph()
+
+
+def iter_csv_blocks(lines, text_columns=None):
+    """
+    One paragraph block per CSV row: 'column: value' pairs of the text
+    columns. Offsets are character offsets of the row, as in iter_blocks.
+    """
+    consumed = 0  # characters of input handed to the reader so far
+
+    def counted():
+        nonlocal consumed
+        for line in lines:
+            consumed += len(line)
+            yield line
+
+    reader = csv.reader(counted())
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [i for i, name in enumerate(header) if text_columns is None or name in text_columns]
+    end = consumed
+    for row in reader:
+        # A quoted field can span lines; the row starts where the last ended
+        start, end = end, consumed
+        text = '\n'.join(f'{header[i]}: {row[i]}' for i in columns if i < len(row) and row[i])
+        if text:
+            yield ('paragraph', 0, text, start)
+
+
+# Splitting ----------------------------------------------------------------
+
+def _cut_point(text, limit, floor=0):
+    """
+    Where to cut text so the first piece is at most limit characters: after
+    the last sentence end that fits, else at the last space, else at limit.
+    The cut always lands past floor.
+    """
+    cut = 0
+    for match in SENTENCE_END.finditer(text, floor, limit + 1):
+        cut = match.end()
+    if cut > floor:
+        return cut
+    space = text.rfind(' ', floor, limit + 1)
+    return space + 1 if space > floor else limit
+
+
+def overlap_tail(text, overlap):
+    """The last ~overlap characters of text, starting on a sentence or word."""
+    if overlap <= 0 or not text:
+        return ''
+    if len(text) <= overlap:
+        return text
+    tail = text[-overlap:]
+    sentence = SENTENCE_END.search(tail)
+    if sentence and sentence.end() < len(tail):
+        return tail[sentence.end():]
+    word = WHITESPACE.search(tail)
+    return tail[word.end():] if word else ''
+
+
+def split_long(text, max_chars, overlap):
+    """
+    Cut a paragraph into pieces of at most max_chars, each overlapping the last.
+
+    Returns:
+        List of (piece, overlap, start): overlap is the length of the carried
+        prefix (0 for the first piece), start the position in text where the
+        piece's new text begins.
+    """
+    pieces, floor, carry, start = [], 0, '', 0
+    while len(text) > max_chars:
+        # floor keeps the cut past the carried overlap, so every piece adds text
+        cut = _cut_point(text, max_chars, floor)
+        piece = text[:cut].rstrip()
+        pieces.append((piece, len(carry), start))
+        rest = text[cut:].lstrip()
+        start += len(text) - len(rest) - floor
+        carry = overlap_tail(piece, overlap)
+        if carry and len(carry) < max_chars // 2:
+            text, floor = carry + ' ' + rest, len(carry) + 1
+        else:
+            text, floor, carry = rest, 0, ''
+    pieces.append((text, len(carry), start))
+    return pieces
+
+
+# Chunking -----------------------------------------------------------------
+
+class Chunker:
+    """
+    Turns a document's blocks into chunks; feed() blocks, then close().
+    With whole_blocks the overlap is made of whole trailing blocks (e.g. CSV
+    rows) rather than a sentence-snapped tail.
+    """
+
+    def __init__(self, doc_id, max_chars=DEFAULT_MAX_CHARS, overlap=DEFAULT_OVERLAP, separator='\n\n',
+                 whole_blocks=False):
+        if overlap >= max_chars:
+            raise ValueError('overlap must be smaller than max_chars')
+        self.doc_id = doc_id
+        self.max_chars = max_chars
+        self.overlap = overlap
+        self.separator = separator
+        self.whole_blocks = whole_blocks
+        self.headings = []  # (level, title) of the current heading path
+        self.section = 0
+        self._open_section()
+
+    def _open_section(self):
+        self.parent_id = f'{self.doc_id}#{self.section}'
+        self.heading = ' > '.join(title for _, title in self.headings)
+        self.children = []
+        self.parts, self.size, self.start = [], 0, None
+        self.carry = ''
+        self.carry_used = ''  # the overlap that opens the chunk being built
+
+    def _chunk(self, text, offset, overlap=0, part=None, parts=None):
+        chunk = Chunk(f'{self.parent_id}.{len(self.children)}', 'chunk', self.doc_id, self.parent_id,
+                      self.section, len(self.children), self.heading, text, offset, part, parts, overlap)
+        self.children.append(chunk.id)
+        return chunk
+
+    def _flush(self):
+        """Emit the chunk being built, if it has new text beyond the overlap."""
+        chunks = []
+        has_new_text = len(self.parts) > (1 if self.carry_used else 0)
+        if has_new_text:
+            text = self.separator.join(self.parts)
+            chunks.append(self._chunk(text, self.start, len(self.carry_used)))
+            self.carry = self._whole_tail() if self.whole_blocks else overlap_tail(text, self.overlap)
+        self.parts, self.size, self.start = [], 0, None
+        return chunks
+
+    def _whole_tail(self):
+        tail, size = [], 0
+        for part in reversed(self.parts):
+            size += len(part) + (len(self.separator) if tail else 0)
+            if size > self.overlap:
+                break
+            tail.insert(0, part)
+        return self.separator.join(tail)
+
+    def _close_section(self):
+        chunks = self._flush()
+        if self.children:
+            chunks.append(Chunk(self.parent_id, 'section', self.doc_id, None, self.section, None,
+                                self.heading, self.headings[-1][1] if self.headings else '',
+                                children=self.children))
+        return chunks
+
+    def _add(self, text, offset):
+        if not self.parts:
+            self.start = offset
+            self.carry_used = ''
+            if self.carry and len(self.carry) + len(self.separator) + len(text) <= self.max_chars:
+                self.carry_used = self.carry
+                self.parts, self.size = [self.carry], len(self.carry)
+        self.size += (len(self.separator) if self.parts else 0) + len(text)
+        self.parts.append(text)
+
+    def feed(self, block):
+        kind, level, text, offset = block
+        if kind == 'heading':
+            chunks = self._close_section()
+            while self.headings and self.headings[-1][0] >= level:
+                self.headings.pop()
+            self.headings.append((level, text))
+            self.section += 1
+            self._open_section()
+            return chunks
+
+        if len(text) > self.max_chars:
+            chunks = self._flush()
+            pieces = split_long(text, self.max_chars, self.overlap)
+            for part, (piece, overlap, start) in enumerate(pieces, start=1):
+                # A CSV row's text is rendered from its fields, so its pieces
+                # can only point at the row itself
+                piece_offset = offset if self.whole_blocks else offset + start
+                chunks.append(self._chunk(piece, piece_offset, overlap, part, len(pieces)))
+            # With whole_blocks the overlap is whole rows, and a split row is
+            # longer than any overlap, so nothing carries over
+            self.carry = '' if self.whole_blocks else overlap_tail(pieces[-1][0], self.overlap)
+            return chunks
+
+        chunks = []
+        if self.parts and self.size + len(self.separator) + len(text) > self.max_chars:
+            chunks = self._flush()
+        self._add(text, offset)
+        return chunks
+
+    def close(self):
+        return self._close_section()
+
+
+def chunk_blocks(blocks, doc_id, max_chars=DEFAULT_MAX_CHARS, overlap=DEFAULT_OVERLAP, separator='\n\n',
+                 whole_blocks=False):
+    """Generator of chunks (and section records) for a stream of blocks."""
+    chunker = Chunker(doc_id, max_chars, overlap, separator, whole_blocks)
+    for block in blocks:
+        yield from chunker.feed(block)
+    yield from chunker.close()
+
+
+def chunk_text(lines, doc_id, max_chars=DEFAULT_MAX_CHARS, overlap=DEFAULT_OVERLAP):
+    """Chunk markdown or plain text, given as any iterable of lines (e.g. an open file)."""
+    return chunk_blocks(iter_blocks(lines), doc_id, max_chars, overlap)
+
+
+def chunk_file(path, doc_id=None, max_chars=DEFAULT_MAX_CHARS, overlap=DEFAULT_OVERLAP, text_columns=None):
+    """
+    Stream the chunks of one file. CSV files are chunked by rows (whole rows,
+    one "column: value" line per field, overlapping by whole rows); anything
+    else as text.
+    """
+    doc_id = doc_id or os.path.basename(path)
+    is_csv = _extension(path) in CSV_EXTENSIONS
+    with open(path, newline='' if is_csv else None, encoding='utf-8', errors='replace') as f:
+        if is_csv:
+            yield from chunk_blocks(iter_csv_blocks(f, text_columns), doc_id, max_chars, overlap, '\n\n', True)
+        else:
+            yield from chunk_text(f, doc_id, max_chars, overlap)
+
+
+def _extension(name):
+    # The RAG notes are named like "3. Chunking Data for RAG", whose
+    # splitext() "extension" is not one
+    extension = os.path.splitext(name)[1].lower()
+    return extension if re.fullmatch(r'\.[a-z0-9]{1,8}', extension) else ''
+
+
+def find_documents(paths):
+    """Files under the given files/directories that chunk_file can read, sorted."""
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for name in sorted(files):
+                    if not name.startswith('.') and _extension(name) in TEXT_EXTENSIONS | CSV_EXTENSIONS:
+                        found.append(os.path.join(root, name))
+        else:
+            found.append(path)
+    return found
+
+
+def _chunk_document(args):
+    path, doc_id, max_chars, overlap = args
+    return list(chunk_file(path, doc_id, max_chars, overlap))
+
+
+def chunk_corpus(paths, workers=None, max_chars=DEFAULT_MAX_CHARS, overlap=DEFAULT_OVERLAP, root=None):
+    """
+    Chunk many documents, one document per task on a process pool, yielding
+    chunks in document order. With workers=1 everything streams in-process.
+    Document IDs are paths relative to root (default: the common directory).
+
+    In parallel each worker buffers a whole document's chunks, and at most
+    2 x workers documents are submitted ahead of the one being yielded, so
+    large documents cost memory in proportion to their size.
+    """
+    paths = list(paths)
+    if not paths:
+        return
+    root = root or os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    tasks = [(p, os.path.relpath(os.path.abspath(p), root), max_chars, overlap) for p in paths]
+    if workers == 1:
+        for path, doc_id, _, _ in tasks:
+            yield from chunk_file(path, doc_id, max_chars, overlap)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # pool.map would submit every task up front; keep a bounded window
+        in_flight = deque()
+        for task in tasks:
+            in_flight.append(pool.submit(_chunk_document, task))
+            if len(in_flight) >= 2 * workers:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+
+def write_jsonl(chunks, path):
+    """Write chunks one JSON object per line; returns how many were written."""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(json.dumps(chunk.to_dict(), ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+# Benchmark ----------------------------------------------------------------
+
+NOTES_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+
+def synthetic_corpus(out_dir, total_mb=64, doc_kb=512, seed=0):
+    """
+    Write a markdown corpus of about total_mb built from the paragraphs of
+    the RAG notes in this repo, with headings every few paragraphs and the
+    occasional very long paragraph. Returns the file paths.
+    """
+    paragraphs = []
+    for name in sorted(os.listdir(NOTES_DIR)):
+        path = os.path.join(NOTES_DIR, name)
+        if os.path.isfile(path) and not name.startswith('.'):
+            with open(path, encoding='utf-8') as f:
+                paragraphs += [p.strip() for p in f.read().split('\n\n') if p.strip()]
+    rng = random.Random(seed)
+    paths, written, doc = [], 0, 0
+    while written < total_mb * 1024 ** 2:
+        path = os.path.join(out_dir, f'doc_{doc:05d}.md')
+        with open(path, 'w', encoding='utf-8') as f:
+            size, section = 0, 0
+            while size < doc_kb * 1024:
+                heading = f"{'#' * rng.randint(1, 3)} Section {section}\n\n"
+                body = [rng.choice(paragraphs) for _ in range(rng.randint(2, 8))]
+                if rng.random() < 0.05:
+                    body.append(' '.join(rng.choice(paragraphs) for _ in range(6)))
+                text = heading + '\n\n'.join(body) + '\n\n'
+                f.write(text)
+                size += len(text.encode())
+                section += 1
+        paths.append(path)
+        written += os.path.getsize(path)
+        doc += 1
+    return paths
+
+
+def benchmark(paths, workers_options, max_chars=DEFAULT_MAX_CHARS, overlap=DEFAULT_OVERLAP):
+    """Chunking throughput in MB/s of input for each worker count."""
+    total_mb = sum(os.path.getsize(p) for p in paths) / 1024 ** 2
+    results = []
+    for workers in workers_options:
+        start = time.perf_counter()
+        chunks = sections = 0
+        for chunk in chunk_corpus(paths, workers, max_chars, overlap):
+            if chunk.kind == 'chunk':
+                chunks += 1
+            else:
+                sections += 1
+        seconds = time.perf_counter() - start
+        results.append({
+            'workers': workers,
+            'documents': len(paths),
+            'input_mb': round(total_mb, 1),
+            'chunks': chunks,
+            'sections': sections,
+            'seconds': round(seconds, 3),
+            'mb_per_s': round(total_mb / seconds, 2),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Chunk documents for RAG, or benchmark the chunker')
+    parser.add_argument('paths', nargs='*', help='files or directories (default: the RAG notes)')
+    parser.add_argument('--max-chars', type=int, default=DEFAULT_MAX_CHARS)
+    parser.add_argument('--overlap', type=int, default=DEFAULT_OVERLAP)
+    parser.add_argument('--workers', type=int, nargs='+', default=[os.cpu_count() or 1])
+    parser.add_argument('--out', default=None, help='write the chunks here as JSON lines')
+    parser.add_argument('--benchmark', action='store_true', help='report MB/s for each --workers value')
+    parser.add_argument('--synthetic-mb', type=float, default=None,
+                        help='benchmark on a generated corpus of this size instead of paths')
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.synthetic_mb:
+        tmp_dir = tempfile.mkdtemp(prefix='rag_corpus_')
+        paths = synthetic_corpus(tmp_dir, args.synthetic_mb)
+    else:
+        paths = find_documents(args.paths or [NOTES_DIR])
+    try:
+        if args.benchmark:
+            for row in benchmark(paths, args.workers, args.max_chars, args.overlap):
+                print(row)
+        else:
+            chunks = chunk_corpus(paths, args.workers[0], args.max_chars, args.overlap)
+            if args.out:
+                print(f"{write_jsonl(chunks, args.out)} records written to {args.out}")
+            else:
+                for chunk in chunks:
+                    print(json.dumps(chunk.to_dict(), ensure_ascii=False))
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,373 @@
+# Assemble retrieved chunks into a prompt context under a token budget
+#
+# "2. How to Stop Context Rot": every irrelevant or repeated token in the
+# context costs prefill time (time to first token) and answer quality, and
+# "8. Selecting an Inference Model" prices 4k vs 32k contexts. Rather than
+# pasting the top k chunks, pack_context:
+#  1. drops chunks scoring below min_relevance of the best one
+#  2. drops near-duplicates (the same paragraph under two documents, a
+#     re-ingested file): MinHash over word 3-shingles (Jaccard estimate) or
+#     SimHash (Hamming distance); the higher-scoring copy is kept
+#  3. fills the budget greedily by relevance per token. A chunk whose
+#     sibling (same parent section, next/previous index) is already in only
+#     costs its text past the overlap the chunker repeated between them
+#  4. emits the kept chunks grouped by section, in document order, with
+#     adjacent siblings merged back into one passage under one heading
+#
+# Token counts come from a pluggable counter: any function text -> int.
+# approximate_tokens is a local estimate (word pieces + punctuation);
+# tiktoken_counter uses OpenAI's tokenizer when tiktoken is installed.
+#
+# Usage: python context_packer.py "query" [paths ...] [--budget 1000]
+#        python context_packer.py --benchmark [--synthetic-mb 2] [--budget 2000]
+
+import argparse
+import hashlib
+import re
+import time
+
+import numpy as np
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+DEFAULT_BUDGET = 2000
+DEFAULT_MIN_RELEVANCE = 0.2
+MINHASH_PERMUTATIONS = 64
+MINHASH_THRESHOLD = 0.7
+SIMHASH_MAX_DISTANCE = 3
+SHINGLE = 3
+# Prefill speed used to turn prompt tokens into an estimated time to first
+# token; roughly a 7B model on one consumer GPU
+DEFAULT_PREFILL_TOKENS_PER_S = 2000
+
+WORD = re.compile(r'\w+')
+TOKEN_PIECE = re.compile(r'\w+|[^\w\s]')
+_MERSENNE = np.uint64((1 << 61) - 1)
+
+
+# Token counting -----------------------------------------------------------
+
+def approximate_tokens(text):
+    """
+    Local estimate of BPE tokens: one per punctuation mark and one per word,
+    plus one for every further 6 characters of a long word.
+    """
+    return sum(1 + (len(piece) - 1) // 6 for piece in TOKEN_PIECE.findall(text))
+
+
+def tiktoken_counter(encoding='cl100k_base'):
+    """A token counter using tiktoken's encoding (requires tiktoken)."""
+    if tiktoken is None:
+        raise ImportError('tiktoken is not installed; use approximate_tokens')
+    encoder = tiktoken.get_encoding(encoding)
+    return lambda text: len(encoder.encode(text, disallowed_special=()))
+
+
+# Near-duplicates ----------------------------------------------------------
+
+def _hashes(features):
+    return np.array([int.from_bytes(hashlib.blake2b(f.encode(), digest_size=8).digest(), 'little')
+                     for f in features], dtype=np.uint64)
+
+
+def _shingles(text, size=SHINGLE):
+    words = WORD.findall(text.lower())
+    if len(words) <= size:
+        return [' '.join(words)]
+    return [' '.join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def minhash_signature(text, permutations=MINHASH_PERMUTATIONS, seed=0):
+    """MinHash of the text's word shingles; equal entries estimate Jaccard similarity."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 1 << 32, permutations, dtype=np.uint64)
+    b = rng.integers(0, 1 << 32, permutations, dtype=np.uint64)
+    # 32-bit hashes keep a * h + b below 2**64
+    hashes = _hashes(set(_shingles(text))) & np.uint64(0xFFFFFFFF)
+    return ((np.outer(hashes, a) + b) % _MERSENNE).min(axis=0)
+
+
+def simhash(text):
+    """64-bit SimHash of the text's words and word pairs."""
+    words = WORD.findall(text.lower())
+    hashes = _hashes(words + [a + ' ' + b for a, b in zip(words, words[1:])])
+    if not len(hashes):
+        return np.uint64(0)
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    votes = (2 * bits.astype(np.int64) - 1).sum(axis=0)
+    return np.packbits(votes > 0, bitorder='little').view(np.uint64)[0]
+
+
+def near_duplicates(texts, method='minhash', threshold=None):
+    """
+    For texts in priority order, a boolean array marking each text that is a
+    near-duplicate of an earlier one that was kept.
+
+    Args:
+        method: 'minhash' (threshold: minimum estimated Jaccard similarity)
+            or 'simhash' (threshold: maximum Hamming distance).
+    """
+    duplicate = np.zeros(len(texts), dtype=bool)
+    if method == 'minhash':
+        threshold = MINHASH_THRESHOLD if threshold is None else threshold
+        signatures = np.stack([minhash_signature(t) for t in texts]) if texts else None
+        for i in range(1, len(texts)):
+            kept = np.flatnonzero(~duplicate[:i])
+            similarity = (signatures[kept] == signatures[i]).mean(axis=1)
+            duplicate[i] = similarity.max() >= threshold
+    elif method == 'simhash':
+        threshold = SIMHASH_MAX_DISTANCE if threshold is None else threshold
+        hashes = np.array([simhash(t) for t in texts], dtype=np.uint64)
+        for i in range(1, len(texts)):
+            kept = np.flatnonzero(~duplicate[:i])
+            duplicate[i] = np.bitwise_count(hashes[kept] ^ hashes[i]).min() <= threshold
+    else:
+        raise ValueError(f"method must be 'minhash' or 'simhash', got {method!r}")
+    return duplicate
+
+
+# Packing ------------------------------------------------------------------
+
+def _field(chunk, name, default=None):
+    if isinstance(chunk, dict):
+        return chunk.get(name, default)
+    return getattr(chunk, name, default)
+
+
+def _sibling_key(chunk):
+    parent, index = _field(chunk, 'parent_id'), _field(chunk, 'index')
+    return None if parent is None or index is None else (parent, index)
+
+
+def _new_text(chunk, previous_selected):
+    """The chunk's text, minus the overlap it repeats when its predecessor is in."""
+    text = _field(chunk, 'text')
+    overlap = _field(chunk, 'overlap') or 0
+    return text[overlap:].lstrip() if previous_selected and overlap else text
+
+
+def _header(chunk):
+    doc_id, heading = _field(chunk, 'doc_id'), _field(chunk, 'heading')
+    label = ' > '.join(part for part in (doc_id, heading) if part)
+    return f'[{label}]' if label else ''
+
+
+def render_context(chunks, separator='\n\n'):
+    """
+    Context text for chunks: grouped by section in document order, runs of
+    adjacent siblings joined into one passage without their repeated overlap.
+    """
+    by_key = {_sibling_key(c): c for c in chunks if _sibling_key(c)}
+    ordered = sorted(chunks, key=lambda c: (str(_field(c, 'doc_id', '')), _field(c, 'section') or 0,
+                                            _field(c, 'index') or 0))
+    passages, header, passage = [], None, []
+    for chunk in ordered:
+        key = _sibling_key(chunk)
+        follows = key is not None and (key[0], key[1] - 1) in by_key
+        if passage and not follows:
+            passages.append((header, separator.join(passage)))
+            passage = []
+        if not passage:
+            header = _header(chunk)
+        passage.append(_new_text(chunk, follows))
+    if passage:
+        passages.append((header, separator.join(passage)))
+    return separator.join(f'{h}\n{text}' if h else text for h, text in passages)
+
+
+def pack_context(candidates, budget=DEFAULT_BUDGET, count_tokens=approximate_tokens,
+                 min_relevance=DEFAULT_MIN_RELEVANCE, dedupe='minhash', dedupe_threshold=None):
+    """
+    Choose and render the retrieved chunks to send as context.
+
+    Args:
+        candidates: (chunk, score) pairs from retrieval; a chunk is a
+            chunking.Chunk or a dict with at least 'text' (and optionally
+            'id', 'doc_id', 'parent_id', 'index', 'heading', 'overlap').
+        budget: Maximum tokens of context.
+        count_tokens: Token counter, text -> int.
+        min_relevance: Drop chunks scoring below this fraction of the best.
+        dedupe: 'minhash', 'simhash' or None.
+
+    Returns:
+        (context, report): the context text and a dict of what was kept,
+        dropped and why, and the token counts.
+    """
+    candidates = sorted(candidates, key=lambda pair: -pair[1])
+    report = {'candidates': len(candidates), 'low_relevance': 0, 'duplicates': 0, 'over_budget': 0}
+    if not candidates:
+        return '', {**report, 'chunks': 0, 'tokens': 0, 'ids': []}
+
+    best = candidates[0][1]
+    if best > 0:
+        relevant = [(c, s) for c, s in candidates if s >= min_relevance * best]
+        report['low_relevance'] = len(candidates) - len(relevant)
+        candidates = relevant
+    if dedupe:
+        duplicate = near_duplicates([_field(c, 'text') for c, _ in candidates], dedupe, dedupe_threshold)
+        report['duplicates'] = int(duplicate.sum())
+        candidates = [pair for pair, dup in zip(candidates, duplicate) if not dup]
+
+    # Greedy by relevance per token; the cost of a chunk is what it adds
+    # given the siblings already selected
+    tokens = [max(count_tokens(_field(c, 'text')), 1) for c, _ in candidates]
+    order = sorted(range(len(candidates)), key=lambda i: -candidates[i][1] / tokens[i])
+    selected, selected_keys, used = {}, set(), 0
+    for i in order:
+        chunk = candidates[i][0]
+        key = _sibling_key(chunk)
+        previous_in = key is not None and (key[0], key[1] - 1) in selected_keys
+        next_in = key is not None and (key[0], key[1] + 1) in selected_keys
+        cost = count_tokens(_new_text(chunk, previous_in))
+        if next_in:
+            # The next chunk no longer needs to repeat this one's tail
+            following = next(c for c in selected.values() if _sibling_key(c) == (key[0], key[1] + 1))
+            cost -= count_tokens(_field(following, 'text')) - count_tokens(_new_text(following, True))
+        # A passage header is paid once per run of siblings
+        header = count_tokens(_header(chunk))
+        if not previous_in and not next_in:
+            cost += header
+        elif previous_in and next_in:
+            cost -= header
+        if used + cost > budget:
+            report['over_budget'] += 1
+            continue
+        selected[i] = chunk
+        used += cost
+        if key is not None:
+            selected_keys.add(key)
+
+    # Separators between passages are not in the estimate above; drop the
+    # least dense chunks until the rendered text fits
+    context = render_context(list(selected.values()))
+    while selected and count_tokens(context) > budget:
+        del selected[min(selected, key=lambda i: candidates[i][1] / tokens[i])]
+        report['over_budget'] += 1
+        context = render_context(list(selected.values()))
+    report.update({'chunks': len(selected), 'tokens': count_tokens(context),
+                   'ids': [_field(c, 'id') for c in selected.values()]})
+    return context, report
+
+
+def naive_context(candidates, k, separator='\n\n'):
+    """The baseline: the top k chunks' text, concatenated in score order."""
+    top = sorted(candidates, key=lambda pair: -pair[1])[:k]
+    return separator.join(_field(c, 'text') for c, _ in top)
+
+
+# Benchmark ----------------------------------------------------------------
+
+def estimated_ttft(tokens, prefill_tokens_per_s=DEFAULT_PREFILL_TOKENS_PER_S):
+    """Time to first token if prefill dominates: prompt tokens / prefill speed."""
+    return tokens / prefill_tokens_per_s
+
+
+def _query_coverage(text, query):
+    """Fraction of the query's distinct words found in text."""
+    words = set(WORD.findall(query.lower()))
+    return len(words & set(WORD.findall(text.lower()))) / max(len(words), 1)
+
+
+def benchmark(chunks, queries, budget=DEFAULT_BUDGET, depth=40, naive_k=20, count_tokens=approximate_tokens):
+    """
+    For each query, BM25-retrieve depth chunks and build the naive top-k
+    context and the packed one; mean tokens, estimated TTFT, query-word
+    coverage and packing time.
+    """
+    import tempfile
+
+    from lexical_index import BM25Builder, BM25Index
+
+    builder = BM25Builder()
+    for chunk in chunks:
+        builder.add(chunk.text, chunk.id)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = BM25Index(builder.write(tmp))
+        rows = {'naive': [], 'packed': []}
+        for query in queries:
+            docs, scores = index.search(query, depth)
+            candidates = [(chunks[d], float(s)) for d, s in zip(docs, scores)]
+            start = time.perf_counter()
+            packed, report = pack_context(candidates, budget, count_tokens)
+            pack_s = time.perf_counter() - start
+            naive = naive_context(candidates, naive_k)
+            for label, text, seconds in [('naive', naive, 0.0), ('packed', packed, pack_s)]:
+                tokens = count_tokens(text)
+                rows[label].append((tokens, estimated_ttft(tokens), _query_coverage(text, query), seconds,
+                                    report['duplicates'] if label == 'packed' else 0))
+    results = []
+    for label, values in rows.items():
+        values = np.array(values, dtype=float)
+        results.append({
+            'context': label if label == 'packed' else f'naive top-{naive_k}',
+            'mean_tokens': round(float(values[:, 0].mean())),
+            'max_tokens': int(values[:, 0].max()),
+            'est_ttft_s': round(float(values[:, 1].mean()), 3),
+            'query_coverage': round(float(values[:, 2].mean()), 3),
+            'pack_ms': round(float(values[:, 3].mean()) * 1000, 2),
+            'duplicates_dropped': round(float(values[:, 4].mean()), 1),
+        })
+    return results
+
+
+def _synthetic_queries(chunks, n, seed=0):
+    """Queries of 3-6 content words taken from random chunks."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for i in rng.integers(0, len(chunks), n):
+        words = [w for w in WORD.findall(chunks[i].text.lower()) if len(w) > 4]
+        if words:
+            queries.append(' '.join(rng.choice(words, min(len(words), int(rng.integers(3, 7))), replace=False)))
+    return queries
+
+
+if __name__ == '__main__':
+    import os
+    import shutil
+    import tempfile
+
+    from chunking import NOTES_DIR, chunk_corpus, find_documents, synthetic_corpus
+
+    parser = argparse.ArgumentParser(description='Pack retrieved chunks into a token budget, or benchmark it')
+    parser.add_argument('query', nargs='?')
+    parser.add_argument('paths', nargs='*', help='files or directories (default: the RAG notes)')
+    parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET)
+    parser.add_argument('--depth', type=int, default=40, help='chunks retrieved per query')
+    parser.add_argument('--dedupe', choices=['minhash', 'simhash', 'none'], default='minhash')
+    parser.add_argument('--tiktoken', action='store_true', help='count tokens with tiktoken')
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--synthetic-mb', type=float, default=2)
+    parser.add_argument('--queries', type=int, default=100)
+    args = parser.parse_args()
+    count_tokens = tiktoken_counter() if args.tiktoken else approximate_tokens
+
+    tmp_dir = tempfile.mkdtemp(prefix='rag_pack_')
+    try:
+        if args.benchmark:
+            paths = synthetic_corpus(tmp_dir, args.synthetic_mb, doc_kb=64)
+            chunks = [c for c in chunk_corpus(paths, workers=1) if c.kind == 'chunk']
+            queries = _synthetic_queries(chunks, args.queries)
+            print(f"{len(chunks)} chunks, {len(queries)} queries, budget {args.budget} tokens")
+            for row in benchmark(chunks, queries, args.budget, args.depth, count_tokens=count_tokens):
+                print(row)
+        else:
+            from lexical_index import BM25Builder, BM25Index
+
+            if not args.query:
+                parser.error('a query is required unless --benchmark is given')
+            chunks = [c for c in chunk_corpus(find_documents(args.paths or [NOTES_DIR]), workers=1)
+                      if c.kind == 'chunk']
+            builder = BM25Builder()
+            for chunk in chunks:
+                builder.add(chunk.text, chunk.id)
+            index = BM25Index(builder.write(os.path.join(tmp_dir, 'bm25')))
+            docs, scores = index.search(args.query, args.depth)
+            context, report = pack_context([(chunks[d], float(s)) for d, s in zip(docs, scores)], args.budget,
+                                           count_tokens, dedupe=None if args.dedupe == 'none' else args.dedupe)
+            print(context)
+            print(f"\n{report}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
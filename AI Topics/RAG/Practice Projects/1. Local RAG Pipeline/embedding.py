@@ -0,0 +1,306 @@
+# Batched, concurrent embedding of chunks with a persistent content-hash cache
+#
+# "6. Parallel Execution in RAG": once chunks are cut they can be embedded
+# concurrently, and embedding APIs take batches. EmbeddingPipeline:
+#  - keys every chunk by a hash of (embedder name, text), so identical text
+#    is embedded once, and looks the keys up in an on-disk EmbeddingCache
+#    (SQLite); re-indexing a mostly unchanged corpus only embeds the chunks
+#    whose text changed
+#  - groups the misses into batches bounded by item count and characters
+#  - sends the batches to the embedder concurrently with asyncio, at most
+#    `concurrency` in flight, and writes each batch to the cache as it lands
+#
+# The cache keeps at most max_entries vectors and evicts the least recently
+# used ones.
+#
+# An embedder is any object with `name`, `dim` and an `embed(texts)` method
+# returning a (len(texts), dim) array; embed may be a coroutine (a remote
+# API client) or a plain function, which is run in a worker thread.
+# HashingEmbedder is a deterministic local stand-in for testing.
+#
+# Usage: python embedding.py [paths ...] [--cache .rag_embeddings.sqlite]
+#        python embedding.py --benchmark [--synthetic-mb 4] [--latency 0.05]
+
+import argparse
+import asyncio
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_PATH = '.rag_embeddings.sqlite'
+DEFAULT_MAX_ENTRIES = 1_000_000
+DEFAULT_BATCH_ITEMS = 64
+DEFAULT_BATCH_CHARS = 32_000
+DEFAULT_CONCURRENCY = 8
+
+TOKEN = re.compile(r'\w+')
+
+
+def content_hash(text, model):
+    """Cache key of a text for one embedder: hex SHA-256 of the name and the text."""
+    return hashlib.sha256(f'{model}\0{text}'.encode('utf-8')).hexdigest()
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedder: signed feature hashing of the lowercased
+    words and word pairs of a text, L2-normalised. Texts sharing words get
+    similar vectors, which is enough to exercise retrieval offline.
+
+    latency (seconds per call) and per_item (seconds per text) simulate
+    the round trip of a remote embedding API.
+    """
+
+    def __init__(self, dim=256, latency=0.0, per_item=0.0):
+        self.dim = dim
+        self.latency = latency
+        self.per_item = per_item
+        self.name = f'hashing-{dim}'
+        self.calls = 0
+
+    def embed_one(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        words = TOKEN.findall(text.lower())
+        for feature in words + [a + ' ' + b for a, b in zip(words, words[1:])]:
+            h = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), 'little')
+            vector[h % self.dim] += 1.0 if h >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def embed(self, texts):
+        self.calls += 1
+        if self.latency or self.per_item:
+            await asyncio.sleep(self.latency + self.per_item * len(texts))
+        return np.stack([self.embed_one(t) for t in texts]) if texts else np.empty((0, self.dim), np.float32)
+
+
+class EmbeddingCache:
+    """
+    Persistent map from content hash to float32 vector, in one SQLite file.
+    Every get() or put() of a key marks it as used; once there are more
+    than max_entries keys, the least recently used are deleted.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS embeddings ('
+                        'key TEXT PRIMARY KEY, dim INTEGER, vector BLOB, used INTEGER)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS embeddings_used ON embeddings (used)')
+        # A logical clock rather than wall time, so ties and clock changes
+        # cannot reorder the LRU
+        self.clock = self.db.execute('SELECT COALESCE(MAX(used), 0) FROM embeddings').fetchone()[0]
+        # Upper bound on the entry count, so put_many only counts when it
+        # might be over the limit
+        self.size_bound = len(self)
+        self._evict()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM embeddings').fetchone()[0]
+
+    def _tick(self):
+        self.clock += 1
+        return self.clock
+
+    def get_many(self, keys):
+        """{key: vector} for the keys that are cached."""
+        found = {}
+        keys = list(keys)
+        # SQLite limits the number of parameters per statement
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self.db.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch)
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+        if found:
+            used = self._tick()
+            self.db.executemany('UPDATE embeddings SET used = ? WHERE key = ?', ((used, k) for k in found))
+            self.db.commit()
+        return found
+
+    def put_many(self, items):
+        """Store (key, vector) pairs, then evict down to max_entries."""
+        items = list(items)
+        used = self._tick()
+        self.db.executemany(
+            'INSERT OR REPLACE INTO embeddings (key, dim, vector, used) VALUES (?, ?, ?, ?)',
+            ((key, len(vector), np.asarray(vector, dtype=np.float32).tobytes(), used) for key, vector in items))
+        self.size_bound += len(items)
+        self._evict()
+        self.db.commit()
+
+    def _evict(self):
+        if self.size_bound <= self.max_entries:
+            return
+        excess = len(self) - self.max_entries
+        if excess > 0:
+            self.db.execute('DELETE FROM embeddings WHERE key IN '
+                            '(SELECT key FROM embeddings ORDER BY used LIMIT ?)', (excess,))
+            self.db.commit()
+        self.size_bound = len(self)
+
+    def close(self):
+        self.db.close()
+
+
+def make_batches(items, max_items=DEFAULT_BATCH_ITEMS, max_chars=DEFAULT_BATCH_CHARS):
+    """
+    Split (key, text) items into consecutive batches of at most max_items
+    items and max_chars characters (a longer text gets a batch of its own).
+    """
+    batch, chars = [], 0
+    for key, text in items:
+        if batch and (len(batch) == max_items or chars + len(text) > max_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append((key, text))
+        chars += len(text)
+    if batch:
+        yield batch
+
+
+class EmbeddingPipeline:
+    """Embeds texts through the cache and an embedder; see the module comment."""
+
+    def __init__(self, embedder, cache=None, max_batch_items=DEFAULT_BATCH_ITEMS,
+                 max_batch_chars=DEFAULT_BATCH_CHARS, concurrency=DEFAULT_CONCURRENCY):
+        self.embedder = embedder
+        self.cache = cache
+        self.max_batch_items = max_batch_items
+        self.max_batch_chars = max_batch_chars
+        self.concurrency = concurrency
+        self.stats = {}
+
+    async def _embed_batch(self, batch, semaphore):
+        texts = [text for _, text in batch]
+        async with semaphore:
+            if asyncio.iscoroutinefunction(self.embedder.embed):
+                vectors = await self.embedder.embed(texts)
+            else:
+                vectors = await asyncio.to_thread(self.embedder.embed, texts)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape != (len(texts), self.embedder.dim):
+            raise ValueError(f"Embedder returned shape {vectors.shape} for {len(texts)} texts")
+        pairs = [(key, vector) for (key, _), vector in zip(batch, vectors)]
+        if self.cache is not None:
+            self.cache.put_many(pairs)
+        return pairs
+
+    async def embed_async(self, texts):
+        """
+        Vectors for texts (strings, or chunks with a .text), in order.
+
+        Returns:
+            A (len(texts), dim) float32 array. Pipeline counters for the call
+            are left in self.stats.
+        """
+        start = time.perf_counter()
+        texts = [getattr(t, 'text', t) for t in texts]
+        keys = [content_hash(t, self.embedder.name) for t in texts]
+        unique = dict(zip(keys, texts))
+
+        vectors = self.cache.get_many(unique) if self.cache is not None else {}
+        hits = len(vectors)
+        missing = [(k, t) for k, t in unique.items() if k not in vectors]
+        batches = list(make_batches(missing, self.max_batch_items, self.max_batch_chars))
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        for pairs in await asyncio.gather(*(self._embed_batch(b, semaphore) for b in batches)):
+            vectors.update(pairs)
+
+        self.stats = {
+            'texts': len(texts),
+            'unique': len(unique),
+            'cache_hits': hits,
+            'embedded': len(missing),
+            'batches': len(batches),
+            'seconds': round(time.perf_counter() - start, 3),
+        }
+        if not texts:
+            return np.empty((0, self.embedder.dim), dtype=np.float32)
+        return np.stack([vectors[k] for k in keys])
+
+    def embed(self, texts):
+        """Synchronous embed_async, for callers outside an event loop."""
+        return asyncio.run(self.embed_async(texts))
+
+
+# Benchmark ----------------------------------------------------------------
+
+def _edit(texts, fraction, seed):
+    """A copy of texts with about fraction of them changed."""
+    rng = np.random.default_rng(seed)
+    changed = rng.random(len(texts)) < fraction
+    return [t + ' (revised)' if c else t for t, c in zip(texts, changed)], int(changed.sum())
+
+
+def benchmark(texts, cache_path, latency=0.05, concurrency_options=(1, DEFAULT_CONCURRENCY),
+              changed_fraction=0.05, seed=0):
+    """
+    Cold runs at each concurrency (empty cache), then a re-index after
+    editing changed_fraction of the texts, which should embed only those.
+    """
+    results = []
+    for concurrency in concurrency_options:
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        pipeline = EmbeddingPipeline(HashingEmbedder(latency=latency), EmbeddingCache(cache_path),
+                                     concurrency=concurrency)
+        pipeline.embed(texts)
+        results.append({'run': 'cold', 'concurrency': concurrency, 'changed': None, **pipeline.stats})
+        pipeline.cache.close()
+
+    # Re-index against the cache the last cold run left behind
+    pipeline = EmbeddingPipeline(HashingEmbedder(latency=latency), EmbeddingCache(cache_path),
+                                 concurrency=concurrency_options[-1])
+    edited, changed = _edit(texts, changed_fraction, seed)
+    for label, run_texts, run_changed in [('unchanged', texts, 0), ('edited', edited, changed)]:
+        pipeline.embed(run_texts)
+        results.append({'run': label, 'concurrency': pipeline.concurrency, 'changed': run_changed,
+                        **pipeline.stats})
+    pipeline.cache.close()
+    return results
+
+
+if __name__ == '__main__':
+    from chunking import NOTES_DIR, chunk_corpus, find_documents, synthetic_corpus
+
+    parser = argparse.ArgumentParser(description='Embed chunks through the cache, or benchmark the pipeline')
+    parser.add_argument('paths', nargs='*', help='files or directories to chunk (default: the RAG notes)')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH)
+    parser.add_argument('--max-entries', type=int, default=DEFAULT_MAX_ENTRIES)
+    parser.add_argument('--dim', type=int, default=256)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, DEFAULT_CONCURRENCY])
+    parser.add_argument('--latency', type=float, default=0.05, help='simulated seconds per embedder call')
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--synthetic-mb', type=float, default=4)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        tmp_dir = tempfile.mkdtemp(prefix='rag_embed_')
+        try:
+            paths = synthetic_corpus(tmp_dir, args.synthetic_mb)
+            texts = [c.text for c in chunk_corpus(paths, workers=1) if c.kind == 'chunk']
+            for row in benchmark(texts, os.path.join(tmp_dir, 'cache.sqlite'), args.latency, args.concurrency):
+                print(row)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    else:
+        chunks = [c for c in chunk_corpus(find_documents(args.paths or [NOTES_DIR]), workers=1)
+                  if c.kind == 'chunk']
+        cache = EmbeddingCache(args.cache, args.max_entries)
+        pipeline = EmbeddingPipeline(HashingEmbedder(args.dim), cache, concurrency=args.concurrency[-1])
+        vectors = pipeline.embed(chunks)
+        cache.close()
+        print(f"{len(vectors)} chunks -> {vectors.shape} vectors; {pipeline.stats}")
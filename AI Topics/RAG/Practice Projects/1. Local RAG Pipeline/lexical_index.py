@@ -0,0 +1,510 @@
+# On-disk BM25 inverted index, and rank fusion with vector search
+#
+# The lexical half of the hybrid search in "7. Using LLMs with AWS" (there,
+# OpenSearch), run locally next to vector_index.HNSWIndex.
+#
+# Layout (a directory, like HNSWIndex.save):
+#   postings.bin     every term's posting list, split into blocks of
+#                    BLOCK_SIZE documents. A block is the varint-encoded doc
+#                    ID gaps followed by the varint-encoded term frequencies;
+#                    gaps continue across a term's blocks, so a whole list
+#                    decodes with a single cumsum. Memory-mapped, never read
+#                    whole
+#   *.npy            per term: first block, document frequency, score upper
+#                    bound; per block: byte offset, last doc ID, max score
+#                    ("block-max"); per document: length in tokens
+#   terms.txt        the vocabulary, one term per line, in term ID order
+#   meta.json        k1, b, average document length, doc IDs (optional)
+#
+# search() is exact top-k BM25 with MaxScore pruning. Query terms are taken
+# in decreasing order of their score upper bound. A document first seen at
+# term i can score at most the sum of the bounds of terms i.., so once that
+# sum falls below the current k-th best partial score no new document can
+# reach the top k. From then on only the surviving candidates are scored,
+# candidates that cannot reach the k-th score (even with each block's max)
+# are dropped, and only the blocks that still hold a candidate are decoded.
+# Common, low-IDF terms (the longest lists) are usually the ones skipped.
+#
+# Usage: python lexical_index.py "query" [paths ...] [--k 5]   (hybrid search over the notes)
+#        python lexical_index.py --benchmark [--docs 1000000] [--queries 200]
+
+import argparse
+import collections
+import json
+import os
+import re
+import time
+from array import array
+
+import numpy as np
+
+BLOCK_SIZE = 128
+WRITE_GROUP = 1 << 22
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+RRF_K = 60
+
+TOKEN = re.compile(r'\w+')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the this to was were will with'.split())
+
+_ARRAYS = ('term_blocks', 'df', 'term_max', 'block_offsets', 'block_last_doc', 'block_max', 'doc_lengths')
+
+
+def tokenize(text):
+    """Lowercased word tokens, without stopwords."""
+    return [t for t in TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+# Varints ------------------------------------------------------------------
+
+def varint_lengths(values):
+    """Bytes each value takes as a varint."""
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28, 35, 42, 49, 56, 63):
+        lengths += values >= (np.uint64(1) << np.uint64(shift))
+    return lengths
+
+
+def encode_varints(values):
+    """LEB128 bytes (7 bits per byte, high bit = more) for non-negative integers."""
+    values = np.asarray(values, dtype=np.uint64)
+    lengths = varint_lengths(values)
+    starts = np.cumsum(lengths) - lengths
+    out = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for j in range(int(lengths.max(initial=0))):
+        has = lengths > j
+        byte = (values[has] >> np.uint64(7 * j)) & np.uint64(127)
+        more = (lengths[has] > j + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[has] + j] = byte | more
+    return out
+
+
+def decode_varints(data):
+    """The integers encoded by encode_varints, as uint64."""
+    data = np.asarray(data, dtype=np.uint8)
+    if not len(data):
+        return np.empty(0, dtype=np.uint64)
+    ends = np.flatnonzero(data < 128)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    shifts = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 127).astype(np.uint64) << (7 * shifts).astype(np.uint64)
+    return np.add.reduceat(parts, starts)
+
+
+def _ranges(starts, stops):
+    """Concatenated np.arange(start, stop) for each pair, vectorised."""
+    lengths = stops - starts
+    offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    return np.arange(int(lengths.sum())) + offsets
+
+
+# Building -----------------------------------------------------------------
+
+def write_index(path, terms, posting_terms, posting_docs, posting_tfs, doc_lengths, doc_ids=None,
+                k1=DEFAULT_K1, b=DEFAULT_B):
+    """
+    Write an index from its postings.
+
+    Args:
+        path: Output directory.
+        terms: The vocabulary; term ID i is terms[i].
+        posting_terms, posting_docs, posting_tfs: One entry per (term,
+            document) pair, sorted by term and then document.
+        doc_lengths: Tokens per document, indexed by document ordinal.
+        doc_ids: Optional names of the documents, returned by doc_id().
+    """
+    doc_lengths = np.asarray(doc_lengths, dtype=np.uint32)
+    n_docs, n_terms = len(doc_lengths), len(terms)
+    avgdl = float(doc_lengths.mean()) if n_docs else 0.0
+
+    df = np.bincount(posting_terms, minlength=n_terms)
+    term_starts = np.concatenate([[0], np.cumsum(df)])
+    idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+    norms = k1 * (1 - b + b * doc_lengths / max(avgdl, 1e-9))
+
+    n_blocks = -(-df // BLOCK_SIZE)
+    term_blocks = np.concatenate([[0], np.cumsum(n_blocks)])
+    block_offsets = np.zeros(term_blocks[-1] + 1, dtype=np.uint64)
+    block_last_doc = np.zeros(term_blocks[-1], dtype=np.uint32)
+    block_max = np.zeros(term_blocks[-1])
+    term_max = np.zeros(n_terms)
+
+    os.makedirs(path, exist_ok=True)
+    written = 0
+    with open(os.path.join(path, 'postings.bin'), 'wb') as f:
+        # Whole terms, about WRITE_GROUP postings at a time, so memory stays
+        # bounded however large the corpus
+        first = 0
+        while first < n_terms:
+            last = int(np.searchsorted(term_starts, term_starts[first] + WRITE_GROUP, side='right')) - 1
+            last = min(max(last, first + 1), n_terms)
+            lo, hi = term_starts[first], term_starts[last]
+            docs = np.asarray(posting_docs[lo:hi], dtype=np.int64)
+            tfs = np.asarray(posting_tfs[lo:hi], dtype=np.float64)
+            group_df = df[first:last]
+            starts = term_starts[first:last + 1] - lo
+            scores = np.repeat(idf[first:last], group_df) * tfs * (k1 + 1) / (tfs + norms[docs])
+
+            # Blocks: BLOCK_SIZE postings at a time within each term
+            b0, b1 = term_blocks[first], term_blocks[last]
+            block_term = np.repeat(np.arange(last - first), n_blocks[first:last])
+            block_index = np.arange(b1 - b0) - (term_blocks[first:last] - b0)[block_term]
+            block_starts = starts[block_term] + BLOCK_SIZE * block_index
+            block_stops = np.minimum(block_starts + BLOCK_SIZE, starts[block_term + 1])
+            block_lengths = block_stops - block_starts
+
+            # Gaps continue from the previous posting of the same term (from
+            # 0 for a term's first posting)
+            heads = starts[:-1][group_df > 0]
+            gaps = np.diff(docs, prepend=0)
+            gaps[heads] = docs[heads]
+
+            # Interleave per block: its gaps, then its tfs
+            posting_block = np.repeat(np.arange(b1 - b0), block_lengths)
+            gap_slots = block_starts[posting_block] + np.arange(len(docs))
+            values = np.empty(2 * len(docs), dtype=np.uint64)
+            values[gap_slots] = gaps
+            values[gap_slots + block_lengths[posting_block]] = tfs.astype(np.uint64)
+
+            value_bytes = encode_varints(values)
+            value_offsets = np.concatenate([[0], np.cumsum(varint_lengths(values))])
+            block_offsets[b0:b1] = written + value_offsets[2 * block_starts]
+            value_bytes.tofile(f)
+            written += len(value_bytes)
+            if len(docs):
+                block_last_doc[b0:b1] = docs[block_stops - 1]
+                block_max[b0:b1] = np.maximum.reduceat(scores, block_starts)
+                term_max[first:last][group_df > 0] = np.maximum.reduceat(scores, heads)
+            first = last
+    block_offsets[-1] = written
+
+    arrays = {
+        'term_blocks': term_blocks.astype(np.int64),
+        'df': df.astype(np.uint32),
+        # Bounds are rounded up, so float32 storage never makes pruning unsafe
+        'term_max': _round_up(term_max),
+        'block_offsets': block_offsets,
+        'block_last_doc': block_last_doc,
+        'block_max': _round_up(block_max),
+        'doc_lengths': doc_lengths,
+    }
+    for name in _ARRAYS:
+        np.save(os.path.join(path, f'{name}.npy'), arrays[name])
+    with open(os.path.join(path, 'terms.txt'), 'w', encoding='utf-8') as f:
+        f.writelines(term + '\n' for term in terms)
+    meta = {'k1': k1, 'b': b, 'avgdl': avgdl, 'docs': n_docs, 'terms': n_terms, 'postings': int(term_starts[-1]),
+            'block_size': BLOCK_SIZE, 'doc_ids': None if doc_ids is None else list(doc_ids)}
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return path
+
+
+def _round_up(values):
+    values = np.asarray(values, dtype=np.float64)
+    rounded = values.astype(np.float32)
+    return np.where(rounded < values, np.nextafter(rounded, np.float32(np.inf)), rounded)
+
+
+class BM25Builder:
+    """Collects tokenised documents; write() lays them out as a BM25Index."""
+
+    def __init__(self, tokenizer=tokenize):
+        self.tokenizer = tokenizer
+        self.term_ids = {}
+        self.terms = array('q')
+        self.docs = array('q')
+        self.tfs = array('q')
+        self.doc_lengths = array('q')
+        self.doc_ids = []
+
+    def add(self, text, doc_id=None):
+        """Add a document; returns its ordinal (the ID search() reports)."""
+        doc = len(self.doc_lengths)
+        tokens = self.tokenizer(text)
+        for term, tf in collections.Counter(tokens).items():
+            self.terms.append(self.term_ids.setdefault(term, len(self.term_ids)))
+            self.docs.append(doc)
+            self.tfs.append(tf)
+        self.doc_lengths.append(len(tokens))
+        self.doc_ids.append(doc if doc_id is None else doc_id)
+        return doc
+
+    def write(self, path, k1=DEFAULT_K1, b=DEFAULT_B):
+        terms = np.frombuffer(self.terms, dtype=np.int64)
+        order = np.argsort(terms, kind='stable')  # documents stay ascending within a term
+        return write_index(path, list(self.term_ids), terms[order], np.frombuffer(self.docs, np.int64)[order],
+                           np.frombuffer(self.tfs, np.int64)[order], self.doc_lengths, self.doc_ids, k1, b)
+
+
+# Searching ----------------------------------------------------------------
+
+class BM25Index:
+    """A written index, opened with its postings memory-mapped."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.k1, self.b = self.meta['k1'], self.meta['b']
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+        self.postings = np.memmap(os.path.join(path, 'postings.bin'), dtype=np.uint8, mode='r') \
+            if os.path.getsize(os.path.join(path, 'postings.bin')) else np.empty(0, np.uint8)
+        with open(os.path.join(path, 'terms.txt'), encoding='utf-8') as f:
+            self.term_ids = {line.rstrip('\n'): i for i, line in enumerate(f)}
+        n_docs = self.meta['docs']
+        self.idf = np.log(1 + (n_docs - np.asarray(self.df) + 0.5) / (np.asarray(self.df) + 0.5))
+        avgdl = max(self.meta['avgdl'], 1e-9)
+        self.norms = self.k1 * (1 - self.b + self.b * np.asarray(self.doc_lengths) / avgdl)
+        self.tokenizer = tokenize
+        self.stats = {}
+
+    def __len__(self):
+        return self.meta['docs']
+
+    def doc_id(self, doc):
+        doc_ids = self.meta['doc_ids']
+        return doc if doc_ids is None else doc_ids[doc]
+
+    def _decode(self, term, blocks):
+        """(docs, scores) of a term's postings in the given sorted blocks."""
+        first, stop = self.term_blocks[term], self.term_blocks[term + 1]
+        df = int(self.df[term])
+        lengths = np.minimum(BLOCK_SIZE, df - BLOCK_SIZE * (blocks - first))
+        byte_starts = self.block_offsets[blocks].astype(np.int64)
+        byte_stops = self.block_offsets[blocks + 1].astype(np.int64)
+        if len(blocks) == stop - first:
+            data = self.postings[byte_starts[0]:byte_stops[-1]]
+        else:
+            data = self.postings[_ranges(byte_starts, byte_stops)]
+        values = decode_varints(data).astype(np.int64)
+
+        value_starts = np.cumsum(2 * lengths) - 2 * lengths
+        gap_slots = _ranges(value_starts, value_starts + lengths)
+        gaps = values[gap_slots]
+        tfs = values[gap_slots + np.repeat(lengths, lengths)].astype(np.float64)
+        # Each block continues from the last doc of the block before it
+        bases = np.where(blocks > first, self.block_last_doc[np.maximum(blocks - 1, 0)].astype(np.int64), 0)
+        cumulative = np.cumsum(gaps)
+        block_heads = np.cumsum(lengths) - lengths
+        docs = cumulative - np.repeat(cumulative[block_heads] - gaps[block_heads] - bases, lengths)
+        scores = self.idf[term] * tfs * (self.k1 + 1) / (tfs + self.norms[docs])
+        self.stats['blocks_decoded'] += len(blocks)
+        self.stats['postings_decoded'] += len(docs)
+        return docs, scores
+
+    def _query_terms(self, query):
+        terms = {self.term_ids[t] for t in self.tokenizer(query) if t in self.term_ids}
+        return sorted((t for t in terms if self.df[t]), key=lambda t: -self.term_max[t])
+
+    def search(self, query, k=10, prune=True):
+        """
+        Top-k documents for a text query by BM25.
+
+        Returns:
+            (docs, scores): document ordinals and scores, best first. With
+            prune=False every posting of every query term is scored (the
+            exhaustive baseline).
+        """
+        terms = self._query_terms(query)
+        self.stats = {'terms': len(terms), 'blocks_decoded': 0, 'postings_decoded': 0,
+                      'blocks_total': int(sum(self.term_blocks[t + 1] - self.term_blocks[t] for t in terms))}
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        bounds = np.array([self.term_max[t] for t in terms], dtype=np.float64)
+        remaining = np.cumsum(bounds[::-1])[::-1]  # remaining[i]: best score terms i.. can add
+
+        docs = np.empty(0, dtype=np.int64)
+        acc = np.empty(0, dtype=np.float64)
+        threshold = -np.inf
+        for i, term in enumerate(terms):
+            first, stop = self.term_blocks[term], self.term_blocks[term + 1]
+            if not prune or remaining[i] >= threshold:
+                # Essential: new documents can still reach the top k
+                term_docs, term_scores = self._decode(term, np.arange(first, stop))
+                merged = np.concatenate([docs, term_docs])
+                docs, inverse = np.unique(merged, return_inverse=True)
+                acc = np.bincount(inverse, np.concatenate([acc, term_scores]), len(docs))
+            else:
+                rest = remaining[i + 1] if i + 1 < len(terms) else 0.0
+                last_docs = self.block_last_doc[first:stop]
+                blocks = first + np.searchsorted(last_docs, docs)
+                in_range = blocks < stop
+                block_max = np.where(in_range, self.block_max[np.minimum(blocks, stop - 1)], 0)
+                keep = acc + block_max + rest >= threshold
+                docs, acc, blocks, in_range = docs[keep], acc[keep], blocks[keep], in_range[keep]
+                wanted = np.unique(blocks[in_range])
+                if len(wanted):
+                    term_docs, term_scores = self._decode(term, wanted)
+                    where = np.minimum(np.searchsorted(term_docs, docs), len(term_docs) - 1)
+                    hit = term_docs[where] == docs
+                    acc = acc + np.where(hit, term_scores[where], 0)
+            if prune and len(acc) >= k:
+                threshold = np.partition(acc, len(acc) - k)[len(acc) - k]
+                if i + 1 < len(terms) and remaining[i + 1] < threshold:
+                    # Later terms only rescore: drop what cannot reach the top k
+                    keep = acc + remaining[i + 1] >= threshold
+                    docs, acc = docs[keep], acc[keep]
+
+        if not len(acc):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        # Everything tied with the k-th score, then ties broken by doc
+        # ordinal, so pruned and exhaustive search agree
+        kth = np.partition(acc, len(acc) - min(k, len(acc)))[len(acc) - min(k, len(acc))]
+        top = np.flatnonzero(acc >= kth)
+        top = top[np.lexsort((docs[top], -acc[top]))][:k]
+        return docs[top], acc[top]
+
+
+# Fusion -------------------------------------------------------------------
+
+def reciprocal_rank_fusion(rankings, k=RRF_K, weights=None, limit=None):
+    """
+    Fuse ranked lists of IDs by reciprocal rank: score(d) = sum over lists of
+    weight / (k + rank of d), rank from 1. Only ranks are used, so BM25 and
+    cosine scores need no calibration against each other.
+
+    Returns:
+        [(id, score)], best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = collections.defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] += weight / (k + rank)
+    ranked = sorted(fused.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:limit] if limit else ranked
+
+
+def hybrid_search(lexical, vectors, query, query_vector, k=10, depth=100, weights=None):
+    """
+    Top-k by reciprocal rank fusion of BM25 and vector search. Both indexes
+    must number documents the same way (HNSWIndex IDs = BM25 ordinals).
+    """
+    lexical_docs, _ = lexical.search(query, depth)
+    vector_docs, _ = vectors.search(query_vector, depth)
+    vector_docs = vector_docs[0][vector_docs[0] >= 0]
+    return reciprocal_rank_fusion([lexical_docs.tolist(), vector_docs.tolist()], weights=weights, limit=k)
+
+
+# Benchmark ----------------------------------------------------------------
+
+def _zipf_probabilities(vocabulary, exponent=1.07):
+    weights = 1 / (np.arange(vocabulary) + 2.7) ** exponent
+    return weights / weights.sum()
+
+
+def synthetic_index(path, n_docs=1_000_000, vocabulary=200_000, mean_length=80, seed=0, batch=100_000):
+    """
+    Write an index over n_docs synthetic chunks whose tokens follow a Zipf
+    distribution (as words in text do), without generating the text.
+    """
+    rng = np.random.default_rng(seed)
+    cdf = np.cumsum(_zipf_probabilities(vocabulary))
+    lengths = np.maximum(rng.poisson(mean_length, n_docs), 1)
+    pairs, tfs = [], []
+    for start in range(0, n_docs, batch):
+        batch_lengths = lengths[start:start + batch]
+        tokens = np.minimum(np.searchsorted(cdf, rng.random(int(batch_lengths.sum()))), vocabulary - 1)
+        docs = np.repeat(np.arange(start, start + len(batch_lengths)), batch_lengths)
+        keys, counts = np.unique(docs * vocabulary + tokens, return_counts=True)
+        pairs.append(keys)
+        tfs.append(counts.astype(np.uint16))
+    keys, tfs = np.concatenate(pairs), np.concatenate(tfs)
+    del pairs
+    docs, terms = np.divmod(keys, vocabulary)
+    del keys
+    docs, terms = docs.astype(np.int32), terms.astype(np.int32)
+    order = np.argsort(terms, kind='stable')  # keys were doc-major, so docs stay ascending
+    return write_index(path, [f't{i}' for i in range(vocabulary)], terms[order], docs[order], tfs[order], lengths)
+
+
+def synthetic_queries(n, vocabulary=200_000, seed=1, skip_common=20):
+    """Queries of 2-5 terms drawn with the corpus' Zipf weights, minus the stopword-like head."""
+    rng = np.random.default_rng(seed)
+    probabilities = _zipf_probabilities(vocabulary)
+    probabilities[:skip_common] = 0
+    probabilities /= probabilities.sum()
+    return [' '.join(f't{t}' for t in rng.choice(vocabulary, rng.integers(2, 6), p=probabilities))
+            for _ in range(n)]
+
+
+def benchmark(index, queries, k=10):
+    """Latency of pruned vs exhaustive search, and whether they agree."""
+    results = []
+    for prune in (False, True):
+        latencies, decoded, total, answers = [], 0, 0, []
+        for query in queries:
+            start = time.perf_counter()
+            docs, _ = index.search(query, k, prune=prune)
+            latencies.append(time.perf_counter() - start)
+            decoded += index.stats['blocks_decoded']
+            total += index.stats['blocks_total']
+            answers.append(docs.tolist())
+        latencies = np.array(latencies) * 1000
+        results.append({
+            'search': 'maxscore' if prune else 'exhaustive',
+            'p50_ms': round(float(np.percentile(latencies, 50)), 2),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 2),
+            'mean_ms': round(float(latencies.mean()), 2),
+            'blocks_decoded': f'{decoded / max(total, 1):.1%}',
+        })
+        results[-1]['answers'] = answers
+    agree = sum(a == b for a, b in zip(results[0].pop('answers'), results[1].pop('answers')))
+    return results, agree
+
+
+if __name__ == '__main__':
+    import shutil
+    import tempfile
+
+    parser = argparse.ArgumentParser(description='BM25 + vector hybrid search, or benchmark the BM25 index')
+    parser.add_argument('query', nargs='?')
+    parser.add_argument('paths', nargs='*', help='files or directories to index (default: the RAG notes)')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--benchmark', action='store_true')
+    parser.add_argument('--docs', type=int, default=1_000_000)
+    parser.add_argument('--vocabulary', type=int, default=200_000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--index-dir', default=None, help='keep the benchmark index here')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='rag_bm25_')
+    try:
+        if args.benchmark:
+            path = args.index_dir or os.path.join(tmp_dir, 'index')
+            if not os.path.exists(os.path.join(path, 'meta.json')):
+                start = time.perf_counter()
+                synthetic_index(path, args.docs, args.vocabulary)
+                print(f"Indexed {args.docs} synthetic chunks in {time.perf_counter() - start:.1f}s")
+            index = BM25Index(path)
+            print(f"{len(index)} docs, {index.meta['postings']} postings, "
+                  f"{os.path.getsize(os.path.join(path, 'postings.bin')) / 1024 ** 2:.0f} MB of postings")
+            results, agree = benchmark(index, synthetic_queries(args.queries, args.vocabulary), args.k)
+            for row in results:
+                print(row)
+            print(f"Top-{args.k} identical for {agree}/{args.queries} queries")
+        else:
+            from chunking import NOTES_DIR, chunk_corpus, find_documents
+            from embedding import EmbeddingPipeline, HashingEmbedder
+            from vector_index import HNSWIndex
+
+            if not args.query:
+                parser.error('a query is required unless --benchmark is given')
+            chunks = [c for c in chunk_corpus(find_documents(args.paths or [NOTES_DIR]), workers=1)
+                      if c.kind == 'chunk']
+            builder = BM25Builder()
+            for chunk in chunks:
+                builder.add(chunk.text, chunk.id)
+            lexical = BM25Index(builder.write(os.path.join(tmp_dir, 'bm25')))
+            pipeline = EmbeddingPipeline(HashingEmbedder())
+            vectors = HNSWIndex(pipeline.embedder.dim).add(pipeline.embed(chunks))
+            query_vector = pipeline.embed([args.query])
+            for doc, score in hybrid_search(lexical, vectors, args.query, query_vector, args.k):
+                print(f"{score:.4f}  {lexical.doc_id(doc)}: {chunks[doc].text[:100]!r}")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,421 @@
+# In-process approximate nearest neighbour search (HNSW) for chunk embeddings
+#
+# Implements the ANN advice in "5. Improving RAG Performance": a Hierarchical
+# Navigable Small World graph (Malkov & Yashunin) instead of brute force.
+#  - every vector is a node on layer 0; each node also appears on layers
+#    1..level, with level drawn so that layer l holds ~1/M**l of the nodes
+#  - a query descends greedily from the top layer's entry point, then runs a
+#    best-first search on layer 0 keeping the ef closest nodes seen
+#  - M is the number of links per node on the upper layers (2 * M on layer
+#    0); ef_construction is the search width used while inserting. Higher
+#    values cost build time and memory and buy recall. ef is the query-time
+#    width and can be changed on a built index
+#
+# Distances are 1 - cosine similarity (vectors are normalised on insert) or
+# squared L2. save() writes plain .npy files; load() memory-maps the vectors
+# and the layer-0 links, so a large index opens instantly and its pages are
+# shared between processes.
+#
+# Usage: python vector_index.py [--n 10000] [--dim 64] [--M 16] [--ef 10 50 100]
+#        (recall@k and queries/s against exact NumPy search)
+
+import argparse
+import heapq
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+DEFAULT_M = 16
+DEFAULT_EF_CONSTRUCTION = 100
+DEFAULT_EF = 50
+METRICS = ('cosine', 'l2')
+
+_FILES = ('vectors', 'ids', 'levels', 'links0', 'upper_nodes', 'upper_links')
+
+
+def normalise(vectors):
+    """Rows scaled to unit length (zero rows are left as they are)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class HNSWIndex:
+    """
+    HNSW graph over float32 vectors, addressed by integer IDs.
+
+    add() inserts a batch of vectors and search() returns the k nearest IDs
+    for a batch of queries, closest first.
+    """
+
+    def __init__(self, dim, metric='cosine', M=DEFAULT_M, ef_construction=DEFAULT_EF_CONSTRUCTION,
+                 ef=DEFAULT_EF, seed=0):
+        if metric not in METRICS:
+            raise ValueError(f"metric must be one of {METRICS}, got {metric!r}")
+        if M < 2:
+            raise ValueError('M must be at least 2')
+        self.dim = dim
+        self.metric = metric
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = max(ef_construction, M)
+        self.ef = ef
+        self.level_mult = 1 / math.log(M)
+        self.rng = np.random.default_rng(seed)
+
+        self.count = 0
+        self.vectors = np.empty((0, dim), dtype=np.float32)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.levels = np.empty(0, dtype=np.int8)
+        self.links0 = np.empty((0, self.M0), dtype=np.int32)  # -1 padded
+        self.upper = []  # upper[l - 1]: {node: [neighbour nodes]} for layer l
+        self.entry_point = None
+        self.max_level = -1
+
+    def __len__(self):
+        return self.count
+
+    # Distances -----------------------------------------------------------
+
+    def _prepare(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Expected vectors of dimension {self.dim}, got {vectors.shape[1]}")
+        return normalise(vectors) if self.metric == 'cosine' else vectors
+
+    def _distances(self, query, nodes):
+        """Distances from query to each node in nodes."""
+        vectors = self.vectors[nodes]
+        if self.metric == 'cosine':
+            return 1 - vectors @ query
+        diff = vectors - query
+        return np.einsum('ij,ij->i', diff, diff)
+
+    def _pairwise(self, nodes):
+        vectors = self.vectors[nodes]
+        if self.metric == 'cosine':
+            return 1 - vectors @ vectors.T
+        sq = np.einsum('ij,ij->i', vectors, vectors)
+        return sq[:, None] + sq[None, :] - 2 * vectors @ vectors.T
+
+    # Graph ---------------------------------------------------------------
+
+    def _neighbours(self, node, level):
+        if level == 0:
+            links = self.links0[node]
+            return links[links >= 0].tolist()
+        return self.upper[level - 1].get(node, [])
+
+    def _set_neighbours(self, node, level, neighbours):
+        if level == 0:
+            self.links0[node, :len(neighbours)] = neighbours
+            self.links0[node, len(neighbours):] = -1
+        else:
+            self.upper[level - 1][node] = list(neighbours)
+
+    def _search_layer(self, query, entry_points, ef, level):
+        """
+        Best-first search of one layer from entry_points.
+
+        Returns:
+            Up to ef (distance, node) pairs, closest first.
+        """
+        visited = set(entry_points)
+        distances = self._distances(query, entry_points).tolist()
+        candidates = list(zip(distances, entry_points))
+        heapq.heapify(candidates)
+        results = [(-d, n) for d, n in candidates]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            distance, node = heapq.heappop(candidates)
+            if distance > -results[0][0]:
+                break
+            new = [n for n in self._neighbours(node, level) if n not in visited]
+            if not new:
+                continue
+            visited.update(new)
+            bound = -results[0][0]
+            for d, n in zip(self._distances(query, new).tolist(), new):
+                if d < bound or len(results) < ef:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(results, (-d, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+                    bound = -results[0][0]
+        return sorted((-d, n) for d, n in results)
+
+    def _select(self, candidates, m):
+        """
+        Neighbour selection heuristic: walk candidates (distance, node) from
+        the closest and keep one only if it is closer to the base node than
+        to every node kept so far, so links spread out in all directions.
+        """
+        if len(candidates) <= m:
+            return [n for _, n in candidates]
+        nodes = [n for _, n in candidates]
+        pairwise = self._pairwise(nodes)
+        kept = []
+        for i, (distance, _) in enumerate(candidates):
+            if not kept or pairwise[i, kept].min() > distance:
+                kept.append(i)
+                if len(kept) == m:
+                    break
+        return [nodes[i] for i in kept]
+
+    def _link(self, node, level, neighbours):
+        self._set_neighbours(node, level, neighbours)
+        m_max = self.M0 if level == 0 else self.M
+        for other in neighbours:
+            links = self._neighbours(other, level)
+            if len(links) < m_max:
+                self._set_neighbours(other, level, links + [node])
+                continue
+            # Full: keep the best m_max of its links plus the new node
+            links = links + [node]
+            distances = self._distances(self.vectors[other], links).tolist()
+            self._set_neighbours(other, level, self._select(sorted(zip(distances, links)), m_max))
+
+    def _insert(self, node):
+        query = self.vectors[node]
+        level = int(self.levels[node])
+        while len(self.upper) < level:
+            self.upper.append({})
+
+        if self.entry_point is None:
+            for l in range(1, level + 1):
+                self.upper[l - 1][node] = []
+            self.entry_point, self.max_level = node, level
+            return
+
+        entry = [self.entry_point]
+        for l in range(self.max_level, level, -1):
+            entry = [self._search_layer(query, entry, 1, l)[0][1]]
+        for l in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(query, entry, self.ef_construction, l)
+            self._link(node, l, self._select(found, self.M))
+            entry = [n for _, n in found]
+        for l in range(self.max_level + 1, level + 1):
+            self.upper[l - 1][node] = []
+        if level > self.max_level:
+            self.entry_point, self.max_level = node, level
+
+    def _reserve(self, capacity):
+        """Grow the node arrays (copying memory-mapped ones into memory)."""
+        if capacity <= len(self.vectors) and not isinstance(self.vectors, np.memmap):
+            return
+        capacity = max(capacity, 2 * self.count, 1024)
+
+        def grow(array, fill):
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            return grown
+
+        self.vectors = grow(self.vectors, 0)
+        self.ids = grow(self.ids, -1)
+        self.levels = grow(self.levels, 0)
+        self.links0 = grow(self.links0, -1)
+
+    def add(self, vectors, ids=None):
+        """
+        Insert a batch of vectors.
+
+        Args:
+            vectors: (n, dim) array.
+            ids: n integer IDs returned by search(); default the insertion
+                positions.
+        """
+        vectors = self._prepare(vectors)
+        n = len(vectors)
+        if ids is None:
+            ids = np.arange(self.count, self.count + n)
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(ids) != n:
+            raise ValueError(f"Got {n} vectors but {len(ids)} ids")
+
+        self._reserve(self.count + n)
+        start, end = self.count, self.count + n
+        self.vectors[start:end] = vectors
+        self.ids[start:end] = ids
+        levels = np.floor(-np.log(1 - self.rng.random(n)) * self.level_mult)
+        self.levels[start:end] = np.minimum(levels, np.iinfo(np.int8).max)
+        for node in range(start, end):
+            self.count = node + 1
+            self._insert(node)
+        return self
+
+    def search(self, queries, k=10, ef=None):
+        """
+        The k nearest neighbours of each query.
+
+        Returns:
+            (ids, distances): (n_queries, k) arrays, closest first. Rows are
+            padded with -1 / inf if the index has fewer than k vectors.
+        """
+        queries = self._prepare(queries)
+        ef = max(ef or self.ef, k)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        if self.entry_point is None:
+            return ids, distances
+        for row, query in enumerate(queries):
+            entry = [self.entry_point]
+            for level in range(self.max_level, 0, -1):
+                entry = [self._search_layer(query, entry, 1, level)[0][1]]
+            found = self._search_layer(query, entry, ef, 0)[:k]
+            ids[row, :len(found)] = self.ids[[n for _, n in found]]
+            distances[row, :len(found)] = [d for d, _ in found]
+        return ids, distances
+
+    # Persistence ---------------------------------------------------------
+
+    def save(self, path):
+        """Write the index to the directory path as .npy files plus meta.json."""
+        os.makedirs(path, exist_ok=True)
+        upper_nodes, upper_links = [], []
+        for level, layer in enumerate(self.upper, start=1):
+            for node, links in layer.items():
+                upper_nodes.append((node, level))
+                upper_links.append(links + [-1] * (self.M - len(links)))
+        arrays = {
+            'vectors': self.vectors[:self.count],
+            'ids': self.ids[:self.count],
+            'levels': self.levels[:self.count],
+            'links0': self.links0[:self.count],
+            'upper_nodes': np.array(upper_nodes, dtype=np.int32).reshape(-1, 2),
+            'upper_links': np.array(upper_links, dtype=np.int32).reshape(-1, self.M),
+        }
+        for name in _FILES:
+            np.save(os.path.join(path, f'{name}.npy'), arrays[name])
+        meta = {
+            'dim': self.dim, 'metric': self.metric, 'M': self.M, 'ef_construction': self.ef_construction,
+            'ef': self.ef, 'count': self.count, 'entry_point': self.entry_point, 'max_level': self.max_level,
+        }
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Open an index written by save(). With mmap the vectors, IDs and
+        layer-0 links stay on disk, read-only, until the next add().
+        """
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        index = cls(meta['dim'], meta['metric'], meta['M'], meta['ef_construction'], meta['ef'])
+        mode = 'r' if mmap else None
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in _FILES}
+        index.vectors, index.ids = arrays['vectors'], arrays['ids']
+        index.levels, index.links0 = arrays['levels'], arrays['links0']
+        index.count = meta['count']
+        index.entry_point, index.max_level = meta['entry_point'], meta['max_level']
+        index.upper = [{} for _ in range(max(index.max_level, 0))]
+        for (node, level), links in zip(np.asarray(arrays['upper_nodes']).tolist(),
+                                        np.asarray(arrays['upper_links']).tolist()):
+            index.upper[level - 1][node] = [n for n in links if n >= 0]
+        # Continue the level draws rather than repeating the first index's
+        index.rng = np.random.default_rng(index.count)
+        return index
+
+
+def brute_force_search(vectors, queries, k=10, metric='cosine', ids=None, batch_size=1024):
+    """
+    Exact k nearest neighbours with NumPy, in the same format as
+    HNSWIndex.search: rows padded with -1 / inf when there are fewer than k
+    vectors.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    queries = np.asarray(queries, dtype=np.float32)
+    if metric == 'cosine':
+        vectors, queries = normalise(vectors), normalise(queries)
+    out_ids = np.full((len(queries), k), -1, dtype=np.int64)
+    out_distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+    k = min(k, len(vectors))
+    if k <= 0:
+        return out_ids, out_distances
+    sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        if metric == 'cosine':
+            distances = 1 - batch @ vectors.T
+        else:
+            distances = sq_norms[None, :] - 2 * batch @ vectors.T + np.einsum('ij,ij->i', batch, batch)[:, None]
+        top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        top_distances = np.take_along_axis(distances, top, axis=1)
+        order = np.argsort(top_distances, axis=1)
+        out_ids[start:start + len(batch), :k] = np.take_along_axis(top, order, axis=1)
+        out_distances[start:start + len(batch), :k] = np.take_along_axis(top_distances, order, axis=1)
+    if ids is not None:
+        out_ids[:, :k] = np.asarray(ids)[out_ids[:, :k]]
+    return out_ids, out_distances
+
+
+def recall_at_k(found, truth):
+    """Mean fraction of each query's true k nearest IDs that were found."""
+    k = truth.shape[1]
+    hits = sum(len(set(f[:k].tolist()) & set(t.tolist())) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def synthetic_embeddings(n, dim, clusters=None, seed=0):
+    """Unit vectors drawn around random cluster centres, like topic-clustered chunk embeddings."""
+    rng = np.random.default_rng(seed)
+    clusters = clusters or max(1, n // 500)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    points = centres[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return normalise(points)
+
+
+def benchmark(n=10000, dim=64, queries=500, k=10, M=DEFAULT_M, ef_construction=DEFAULT_EF_CONSTRUCTION,
+              ef_options=(10, 50, 100), seed=0):
+    """Build time, then recall@k and queries/s for each ef, against brute force."""
+    data = synthetic_embeddings(n + queries, dim, seed=seed)
+    vectors, query_vectors = data[:n], data[n:]
+
+    results = []
+    # Batched brute force is one matrix product; one query per call is what
+    # an interactive retriever sees
+    for method, batch_size in [('brute force, batched', 1024), ('brute force, 1 query/call', 1)]:
+        start = time.perf_counter()
+        truth, _ = brute_force_search(vectors, query_vectors, k, batch_size=batch_size)
+        seconds = time.perf_counter() - start
+        results.append({'method': method, 'ef': None, 'recall': 1.0, 'qps': round(queries / seconds)})
+
+    start = time.perf_counter()
+    index = HNSWIndex(dim, M=M, ef_construction=ef_construction, seed=seed).add(vectors)
+    build_s = time.perf_counter() - start
+    for ef in ef_options:
+        start = time.perf_counter()
+        found, _ = index.search(query_vectors, k, ef=ef)
+        seconds = time.perf_counter() - start
+        results.append({'method': f'hnsw M={M}', 'ef': ef, 'recall': round(recall_at_k(found, truth), 4),
+                        'qps': round(queries / seconds)})
+    return results, build_s
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='HNSW recall@k vs queries/s against brute force')
+    parser.add_argument('--n', type=int, default=10000, help='vectors in the index')
+    parser.add_argument('--dim', type=int, default=64)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--M', type=int, default=DEFAULT_M)
+    parser.add_argument('--ef-construction', type=int, default=DEFAULT_EF_CONSTRUCTION)
+    parser.add_argument('--ef', type=int, nargs='+', default=[10, 50, 100])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results, build_s = benchmark(args.n, args.dim, args.queries, args.k, args.M, args.ef_construction,
+                                 args.ef, args.seed)
+    print(f"Built HNSW over {args.n} x {args.dim} vectors in {build_s:.1f}s "
+          f"({args.n / build_s:.0f} inserts/s)")
+    for row in results:
+        print(row)
@@ -1,89 +1,48 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { LineChart, Line, BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 
+const DASHBOARD_API = 'http://127.0.0.1:8050/api';
+
+// Rates are null for weeks / windows with no results to rate
+const formatPercent = (value, { digits, signed = false } = {}) => {
+  if (value === null || value === undefined) return '–';
+  const text = digits === undefined ? `${value}` : value.toFixed(digits);
+  return `${signed && value > 0 ? '+' : ''}${text}%`;
+};
+
 const KYCMonitoringDashboard = () => {
   const [selectedTeam, setSelectedTeam] = useState('kyc-verification');
   const [dateRange, setDateRange] = useState('last-8-weeks');
   const [activeTab, setActiveTab] = useState('health');
 
-  // Mock data
-  const passRateData = [
-    { week: '2017-05', passRate: 82.8 },
-    { week: '2017-06', passRate: 90.9 },
-    { week: '2017-07', passRate: 84.5 },
-    { week: '2017-08', passRate: 79.0 },
-    { week: '2017-09', passRate: 69.7 },
-    { week: '2017-10', passRate: 58.7 },
-  ];
+  // Pass rate, alert and sub-check health series come pre-aggregated from
+  // dashboard_server.py (rollups written by the Python pipeline). Tabs don't
+  // change the query, so only team / date range changes fetch, and the
+  // browser revalidates with the ETag, getting a 304 when nothing changed.
+  const [passRateData, setPassRateData] = useState([]);
+  const [alertsData, setAlertsData] = useState([]);
+  const [subCheckHealth, setSubCheckHealth] = useState([]);
 
-  const alertsData = [
-    { date: 'Oct 1', alerts: 2 },
-    { date: 'Oct 8', alerts: 0 },
-    { date: 'Oct 15', alerts: 1 },
-    { date: 'Oct 22', alerts: 4 },
-    { date: 'Oct 29', alerts: 11 },
-    { date: 'Nov 5', alerts: 8 },
-    { date: 'Nov 12', alerts: 6 },
-    { date: 'Nov 19', alerts: 7 },
-  ];
-
-  const subCheckHealth = [
-    {
-      check: 'image_integrity_result',
-      project: 'document-verification',
-      last8w: 74.2,
-      last7d: 61.7,
-      difference: -12.5,
-      status: 'critical',
-      bars: [1,1,1,1,1,1,1,0,0,0]
-    },
-    {
-      check: 'image_quality_result',
-      project: 'document-verification',
-      last8w: 83.2,
-      last7d: 79.8,
-      difference: -3.4,
-      status: 'warning',
-      bars: [1,1,1,1,1,1,1,1,0,0]
-    },
-    {
-      check: 'visual_authenticity_result',
-      project: 'document-verification',
-      last8w: 98.5,
-      last7d: 98.3,
-      difference: -0.2,
-      status: 'healthy',
-      bars: [1,1,1,1,1,1,1,1,1,1]
-    },
-    {
-      check: 'face_detection_result',
-      project: 'document-verification',
-      last8w: 99.5,
-      last7d: 99.6,
-      difference: 0.1,
-      status: 'healthy',
-      bars: [1,1,1,1,1,1,1,1,1,1]
-    },
-    {
-      check: 'face_comparison_result',
-      project: 'face-verification',
-      last8w: 99.7,
-      last7d: 99.8,
-      difference: 0.1,
-      status: 'healthy',
-      bars: [1,1,1,1,1,1,1,1,1,1]
-    },
-    {
-      check: 'facial_image_integrity_result',
-      project: 'face-verification',
-      last8w: 95.2,
-      last7d: 97.3,
-      difference: 2.1,
-      status: 'improving',
-      bars: [1,1,1,1,1,1,1,1,1,1]
-    },
-  ];
+  useEffect(() => {
+    const controller = new AbortController();
+    const params = new URLSearchParams({ team: selectedTeam, range: dateRange });
+    fetch(`${DASHBOARD_API}/dashboard?${params}`, { signal: controller.signal })
+      .then((response) => {
+        if (!response.ok) throw new Error(`Dashboard API returned ${response.status}`);
+        return response.json();
+      })
+      .then((data) => {
+        setPassRateData(data.passRateData);
+        setAlertsData(data.alertsData);
+        setSubCheckHealth(data.subCheckHealth);
+      })
+      .catch((error) => {
+        if (error.name !== 'AbortError') console.error(error);
+      });
+    return () => controller.abort();
+  }, [selectedTeam, dateRange]);
 
+  // Mock data
   const keyTransactions = [
     {
       transaction: '/api/v2/kyc/document/verify',
@@ -144,6 +103,9 @@ const KYCMonitoringDashboard = () => {
       case 'warning': return '#f5a623';
       case 'healthy': return '#3fb950';
       case 'improving': return '#1f6feb';
+      // No rate to compare (dashboard_rollups._status), e.g. a sub-check
+      // with no results in the window: neutral, not a health state
+      case 'unknown': return '#d0d7de';
       default: return '#6e7781';
     }
   };
@@ -276,7 +238,7 @@ const KYCMonitoringDashboard = () => {
           </div>
         </div>
 
-        {/* Monthly Pass Rate Decline Chart */}
+        {/* Weekly Pass Rate Decline Chart */}
         <div style={{
           background: 'rgba(255,255,255,0.95)',
           borderRadius: '8px',
@@ -291,7 +253,7 @@ const KYCMonitoringDashboard = () => {
             color: '#1e1e1e',
             textAlign: 'center'
           }}>
-            Monthly KYC Pass Rate Decline
+            Weekly KYC Pass Rate Decline
           </h2>
           <ResponsiveContainer width="100%" height={400}>
             <LineChart
@@ -356,7 +318,7 @@ const KYCMonitoringDashboard = () => {
                     fontWeight: '600',
                     fill: '#1e1e1e'
                   },
-                  formatter: (value) => `${value.toFixed(1)}%`
+                  formatter: (value) => formatPercent(value, { digits: 1 })
                 }}
               />
             </LineChart>
@@ -411,10 +373,10 @@ const KYCMonitoringDashboard = () => {
                       <MiniBarChart bars={check.bars} />
                     </td>
                     <td style={{ padding: '0.75rem', textAlign: 'center', fontWeight: '600', fontSize: '0.95rem' }}>
-                      {check.last8w}%
+                      {formatPercent(check.last8w)}
                     </td>
                     <td style={{ padding: '0.75rem', textAlign: 'right', fontWeight: '600', fontSize: '0.95rem' }}>
-                      {check.last7d}%
+                      {formatPercent(check.last7d)}
                     </td>
                     <td style={{
                       padding: '0.75rem',
@@ -422,8 +384,8 @@ const KYCMonitoringDashboard = () => {
                       fontWeight: '600',
                       color: check.difference < 0 ? '#f55459' : check.difference > 0 ? '#3fb950' : '#666'
                     }}>
-                      {check.difference > 0 ? '+' : ''}{check.difference}%
-                      {check.difference < -10 ? ' ↓' : check.difference < 0 ? ' ↓' : check.difference > 0 ? ' ↑' : ''}
+                      {formatPercent(check.difference, { signed: true })}
+                      {check.difference === null ? '' : check.difference < -10 ? ' ↓' : check.difference < 0 ? ' ↓' : check.difference > 0 ? ' ↑' : ''}
                     </td>
                   </tr>
                 ))}
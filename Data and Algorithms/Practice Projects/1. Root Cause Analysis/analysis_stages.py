@@ -0,0 +1,166 @@
+# The independent analysis steps of Root Cause Analysis.py as a stage graph
+#
+# Root Cause Analysis.py calls the same step functions in order, so the
+# notebook-style walkthrough and the parallel run share one implementation.
+# Each stage reads the merged frame from step #4 (plus attempt_passed from
+# step #6) and returns a small result, so stages can run in parallel worker
+# processes via stages.run_graph.
+#
+# With --encode-ids the frame carries 128-bit ID codes instead of hex strings
+# (id_encoding.py); the stages give the same results either way.
+#
+# --profile writes the per-stage timings and memory figures as a JSON report
+# (profiling.py), for comparison across runs.
+#
+# Usage: python analysis_stages.py [--face ...] [--doc ...] [--workers N] [--serial] [--encode-ids]
+#                                  [--profile report.json] [--trace-memory] [--cprofile-dir DIR]
+
+import argparse
+
+import pandas as pd
+
+from failure_types import categorise_failures, subcheck_failure_breakdown
+from id_encoding import decode_ids, id_columns
+from kyc_schema import DOC_REPORTS_CSV, DOC_SUBCHECKS, FACE_REPORTS_CSV, MERGE_KEY, MERGE_SUFFIXES
+from profiling import build_report, measure, summary_table, write_report
+from report_cache import load_reports
+from report_properties import expand_properties
+from stages import StageGraph, run_graph, run_graph_serial
+from subcheck_rates import subcheck_clear_rates
+
+EARLY_DATE = pd.Timestamp('2017-06-30')
+LATE_DATE = pd.Timestamp('2017-10-01')
+
+
+def merge_reports(face_df, doc_df):
+    """#4 Outer merge of the face and document reports on attempt_id."""
+    return pd.merge(face_df, doc_df, on=id_columns(face_df, MERGE_KEY),
+                    suffixes=MERGE_SUFFIXES, how='outer')
+
+
+def flag_passed_attempts(merged_df):
+    """#6 An attempt passes when both its face and document checks are clear."""
+    merged_df['attempt_passed'] = (
+        (merged_df['result_face'] == 'clear') &
+        (merged_df['result_doc'] == 'clear')
+    )
+    return merged_df
+
+
+def build_merged_frame(face_path=FACE_REPORTS_CSV, doc_path=DOC_REPORTS_CSV, encode_ids=False):
+    """
+    Steps #1, #4 and #6: load, merge on attempt_id and flag passed attempts.
+    With encode_ids, the IDs are 128-bit codes and the merge runs on those.
+    """
+    face_df = load_reports(face_path, encode_ids=encode_ids)
+    doc_df = expand_properties(load_reports(doc_path, encode_ids=encode_ids))
+    return flag_passed_attempts(merge_reports(face_df, doc_df))
+
+
+def user_pass_rate(merged_df):
+    """#7 User-level pass rate."""
+    attempt_id = id_columns(merged_df, MERGE_KEY)[0]
+    user_id = [
+        merged_df[f'{column}_face'].fillna(merged_df[f'{column}_doc']).rename(column)
+        for column in id_columns(merged_df, 'user_id')
+    ]
+    user_attempts = merged_df.groupby(user_id).agg({
+        attempt_id: 'count',
+        'attempt_passed': 'any'
+    }).rename(columns={attempt_id: 'num_attempts', 'attempt_passed': 'user_passed'})
+    # Counting the nullable code column gives Int64; match the hex string path
+    user_attempts = user_attempts.astype({'num_attempts': 'int64'})
+    if len(user_id) == 2:
+        # Only the result is decoded back to hex, for reporting
+        hi, lo = (user_attempts.index.get_level_values(i).to_numpy(dtype='uint64') for i in range(2))
+        user_attempts.index = pd.Index(decode_ids(hi, lo), name='user_id')
+    return user_attempts
+
+
+def monthly_trends(merged_df):
+    """#8 Monthly pass rate trends."""
+    month = merged_df['created_at_face'].dt.to_period('M').rename('month')
+    monthly_stats = merged_df.groupby(month).agg({
+        id_columns(merged_df, MERGE_KEY)[0]: 'count',
+        'attempt_passed': ['sum', 'mean']
+    }).round(4)
+    monthly_stats.columns = ['total_attempts', 'passed_attempts', 'pass_rate']
+    return monthly_stats.astype({'total_attempts': 'int64'})
+
+
+def failure_categorisation(merged_df):
+    """#10 Failure type of every failed attempt, indexed like merged_df."""
+    failed_attempts = merged_df[~merged_df['attempt_passed']]
+    return categorise_failures(failed_attempts)
+
+
+def failure_evolution(merged_df, failure_categorisation):
+    """#11 Early vs late failure type mix (the comparison_df)."""
+    created_at = merged_df.loc[failure_categorisation.index, 'created_at_face']
+    early_pct = failure_categorisation[created_at < EARLY_DATE].value_counts(normalize=True) * 100
+    late_pct = failure_categorisation[created_at >= LATE_DATE].value_counts(normalize=True) * 100
+    return pd.DataFrame({
+        'Early': early_pct,
+        'Late': late_pct,
+        'Change': late_pct - early_pct
+    }).round(1)
+
+
+def subcheck_breakdown(merged_df, failure_categorisation, subchecks=DOC_SUBCHECKS):
+    """#13 Non-clear document sub-checks among document-only failures."""
+    doc_only = failure_categorisation.index[failure_categorisation == 'doc_only']
+    return subcheck_failure_breakdown(merged_df.loc[doc_only], subchecks)
+
+
+def subcheck_degradation(merged_df):
+    """#14 and #17 Monthly clear rates for every document and face sub-check."""
+    rates = subcheck_clear_rates(merged_df, granularity='month')
+    rates.index = rates.index.astype(str)
+    return rates
+
+
+def build_analysis_graph():
+    graph = StageGraph()
+    graph.add('user_pass_rate', user_pass_rate)
+    graph.add('monthly_trends', monthly_trends)
+    graph.add('failure_categorisation', failure_categorisation)
+    graph.add('failure_evolution', failure_evolution, deps=['failure_categorisation'])
+    graph.add('subcheck_breakdown', subcheck_breakdown, deps=['failure_categorisation'])
+    graph.add('subcheck_degradation', subcheck_degradation)
+    return graph
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the analysis stages on a process pool')
+    parser.add_argument('--face', default=FACE_REPORTS_CSV)
+    parser.add_argument('--doc', default=DOC_REPORTS_CSV)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--serial', action='store_true', help='run in-process, one stage at a time')
+    parser.add_argument('--encode-ids', action='store_true', help='join and group on 128-bit ID codes')
+    parser.add_argument('--profile', default=None, help='write a JSON profile report here')
+    parser.add_argument('--trace-memory', action='store_true', help='record tracemalloc figures per stage')
+    parser.add_argument('--cprofile-dir', default=None, help='dump a cProfile file per stage here')
+    args = parser.parse_args()
+
+    merged_df, build_record = measure(build_merged_frame, args.face, args.doc, args.encode_ids,
+                                      name='build_merged_frame', trace_memory=args.trace_memory,
+                                      cprofile_dir=args.cprofile_dir)
+    build_record['rows'] = len(merged_df)
+    graph = build_analysis_graph()
+    if args.serial:
+        results, timings = run_graph_serial(graph, merged_df, args.trace_memory, args.cprofile_dir)
+    else:
+        results, timings = run_graph(graph, merged_df, args.workers, args.trace_memory, args.cprofile_dir)
+
+    print(results['monthly_trends'])
+    print()
+    print(results['failure_evolution'])
+    records = [build_record] + timings.attrs['records']
+    print("\nPer-stage profile:")
+    print(summary_table(records).to_string())
+    print(f"\nTotal wall-clock time: {timings.attrs['total_wall_s']}s")
+    if args.profile:
+        write_report(args.profile, build_report(records, timings.attrs['total_wall_s'],
+                                                workers=None if args.serial else args.workers,
+                                                encode_ids=args.encode_ids))
+        print(f"Profile report written to {args.profile}")
@@ -0,0 +1,64 @@
+# Benchmark: row-wise DataFrame.apply vs vectorised failure classification
+#
+# Usage: python benchmark_failure_types.py [--sizes 10000 1000000 10000000]
+#
+# The apply path costs on the order of 100us per row, so above --apply-limit
+# rows it is timed on the first --apply-limit rows and scaled linearly (the
+# 'apply_extrapolated' column says when that happened). Pass --apply-limit 0
+# to time it on every row regardless.
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from failure_types import categorise_failure, categorise_failures
+
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+DEFAULT_APPLY_LIMIT = 1_000_000
+
+
+def synthetic_failed_attempts(n, seed=0):
+    """Random result_face / result_doc pairs with roughly the sample's mix."""
+    rng = np.random.default_rng(seed)
+    values = np.array(['clear', 'consider', None], dtype=object)
+    return pd.DataFrame({
+        'result_face': values[rng.choice(3, size=n, p=[0.75, 0.24, 0.01])],
+        'result_doc': values[rng.choice(3, size=n, p=[0.35, 0.64, 0.01])],
+    })
+
+
+def time_it(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(sizes, apply_limit=DEFAULT_APPLY_LIMIT):
+    rows = []
+    for n in sizes:
+        df = synthetic_failed_attempts(n)
+        sample = df if not apply_limit or n <= apply_limit else df.iloc[:apply_limit]
+        applied, apply_s = time_it(lambda: sample.apply(categorise_failure, axis=1))
+        apply_s *= n / len(sample)
+        vectorised, vector_s = time_it(lambda: categorise_failures(df))
+        rows.append({
+            'rows': n,
+            'apply_s': round(apply_s, 4),
+            'apply_extrapolated': len(sample) < n,
+            'vectorised_s': round(vector_s, 4),
+            'speedup': round(apply_s / vector_s, 1),
+            'labels_match': bool((applied == vectorised.loc[sample.index]).all()),
+        })
+        print(f"{n:>12,} rows done")
+    return pd.DataFrame(rows)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Failure classification benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--apply-limit', type=int, default=DEFAULT_APPLY_LIMIT)
+    args = parser.parse_args()
+
+    print(run(args.sizes, args.apply_limit).to_string(index=False))
@@ -0,0 +1,245 @@
+# Reporting layer: the Root Cause Analysis charts, drawn from computed results
+#
+# Every chart function takes the DataFrames the analysis produced
+# (monthly_stats, comparison_df, results_df, face_results_df), so labels and
+# annotations always match the data. ChartRenderer draws them in a pool of
+# worker processes (matplotlib is not thread-safe) with the non-interactive
+# Agg backend, so the pipeline carries on while the PNGs are written.
+# Each render is measured in its worker (profiling.measure); the records are
+# in ChartRenderer.timings once wait() returns.
+# The pool uses the platform's default start method; under spawn (macOS,
+# Windows) workers re-import the __main__ module, so scripts that create a
+# ChartRenderer must keep their work behind an `if __name__ == '__main__':`
+# guard, as Root Cause Analysis.py does.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from profiling import measure
+
+DEFAULT_DPI = 300
+
+FAILURE_TYPE_LABELS = {
+    'doc_only': 'Document Only',
+    'face_only': 'Face Only',
+    'both_failed': 'Both Failed',
+}
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.style.use('seaborn-v0_8-darkgrid')
+    sns.set_palette("husl")
+
+
+def _render(plot, frames, path, dpi):
+    path, record = measure(plot, *frames, path, name=f"chart {os.path.basename(path)}", dpi=dpi)
+    record['rows'] = sum(len(frame) for frame in frames)
+    return path, record
+
+
+def _save(fig, path, dpi):
+    import matplotlib.pyplot as plt
+
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+
+def plot_monthly_pass_rate(monthly_stats, path, dpi=DEFAULT_DPI):
+    """#9 Monthly pass rate against the 85% target."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    months = [str(m) for m in monthly_stats.index]
+    pass_rates = monthly_stats['pass_rate'].values * 100
+
+    ax.plot(months, pass_rates, marker='o', linewidth=3, markersize=10, color='#e74c3c')
+    ax.axhline(y=85, color='green', linestyle='--', label='Target (85%)', alpha=0.7, linewidth=2)
+
+    ax.set_title('Monthly KYC Pass Rate Decline', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Month', fontsize=12)
+    ax.set_ylabel('Pass Rate (%)', fontsize=12)
+    ax.legend(fontsize=11)
+    ax.grid(True, alpha=0.3)
+    ax.set_ylim(min(50, pass_rates.min() - 5), 100)
+
+    for i, rate in enumerate(pass_rates):
+        ax.annotate(f'{rate:.1f}%',
+                    xy=(i, rate),
+                    xytext=(0, 10),
+                    textcoords='offset points',
+                    ha='center',
+                    fontsize=10,
+                    fontweight='bold')
+
+    return _save(fig, path, dpi)
+
+
+def plot_failure_type_comparison(comparison_df, path, dpi=DEFAULT_DPI,
+                                 early_label='Early (Baseline)', late_label='Late (Problem)'):
+    """#12 Failure type mix, early vs late period, from comparison_df (step #11)."""
+    import matplotlib.pyplot as plt
+
+    mix = comparison_df.reindex(list(FAILURE_TYPE_LABELS))
+    # Label the change printed in the report, not one recomputed from the
+    # rounded bars; it is only derived for a type missing from one period
+    change_values = mix['Change'].fillna(mix['Late'].fillna(0) - mix['Early'].fillna(0)).values
+    mix = mix.fillna(0)
+    failure_types = list(FAILURE_TYPE_LABELS.values())
+    early_values = mix['Early'].values
+    late_values = mix['Late'].values
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+
+    x = np.arange(len(failure_types))
+    width = 0.35
+
+    ax.bar(x - width / 2, early_values, width, label=early_label, color='#3498db')
+    ax.bar(x + width / 2, late_values, width, label=late_label, color='#e74c3c')
+
+    ax.set_title('Failure Type Distribution: Early vs Late', fontsize=16, fontweight='bold', pad=20)
+    ax.set_ylabel('Percentage of Failures (%)', fontsize=12)
+    ax.set_xticks(x)
+    ax.set_xticklabels(failure_types, fontsize=11)
+    ax.legend(fontsize=11)
+    ax.grid(True, alpha=0.3, axis='y')
+    ax.set_ylim(0, 115)
+
+    for i, (e, l, change) in enumerate(zip(early_values, late_values, change_values)):
+        ax.text(i - width / 2, e + 2, f'{e:.1f}%', ha='center', fontsize=10, fontweight='bold')
+        ax.text(i + width / 2, l + 2, f'{l:.1f}%', ha='center', fontsize=10, fontweight='bold')
+
+        color = '#e74c3c' if change > 0 else '#2ecc71'
+        ax.annotate(f'{change:+.1f}%',
+                    xy=(i, max(e, l) + 10),
+                    ha='center',
+                    fontsize=11,
+                    fontweight='bold',
+                    color=color)
+
+    return _save(fig, path, dpi)
+
+
+def plot_subcheck_degradation(results_df, path, dpi=DEFAULT_DPI):
+    """#15 Document sub-check clear rates over time, from results_df (step #14)."""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 7))
+
+    styles = {
+        'image_integrity': dict(marker='o', linewidth=3, markersize=10, color='#e74c3c'),
+        'image_quality': dict(marker='s', linewidth=3, markersize=10, color='#f39c12'),
+        'visual_authenticity': dict(marker='^', linewidth=2, markersize=8, color='#2ecc71'),
+        'face_detection': dict(marker='d', linewidth=2, markersize=8, color='#3498db'),
+    }
+    for column, style in styles.items():
+        ax.plot(results_df['month'], results_df[column], label=column, **style)
+
+    ax.set_title('Document Sub-Check Clear Rates Over Time', fontsize=16, fontweight='bold', pad=20)
+    ax.set_xlabel('Month', fontsize=12)
+    ax.set_ylabel('Clear Rate (%)', fontsize=12)
+    ax.legend(fontsize=11, loc='lower left')
+    ax.grid(True, alpha=0.3)
+    lowest = results_df[list(styles)].min().min()
+    ax.set_ylim(min(55, lowest - 10), 105)
+
+    plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
+
+    # Point at the worst reading of the worst-hit sub-check
+    worst = results_df['image_integrity']
+    worst_i = int(np.argmin(worst.values))
+    ax.annotate('Catastrophic\nDegradation',
+                xy=(worst_i, worst.iloc[worst_i]),
+                xytext=(max(worst_i - 1, 0), worst.iloc[worst_i] + 8),
+                arrowprops=dict(arrowstyle='->', color='red', lw=2),
+                fontsize=11,
+                fontweight='bold',
+                color='red',
+                bbox=dict(boxstyle='round', facecolor='white', edgecolor='red'))
+
+    return _save(fig, path, dpi)
+
+
+def plot_control_group(results_df, face_results_df, path, dpi=DEFAULT_DPI):
+    """#18 Document image_integrity vs face facial_image_integrity."""
+    import matplotlib.pyplot as plt
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
+
+    panels = [
+        (ax1, results_df, 'image_integrity', 'Document image_integrity', '#e74c3c'),
+        (ax2, face_results_df, 'facial_image_integrity', 'Face facial_image_integrity', '#2ecc71'),
+    ]
+    for ax, df, column, title, color in panels:
+        values = df[column]
+        trend = 'DECLINING' if values.iloc[-1] < values.iloc[0] else 'IMPROVING'
+
+        ax.plot(df['month'], values, marker='o', linewidth=3, markersize=10, color=color)
+        ax.set_title(f'{title}\n({trend})', fontsize=14, fontweight='bold', color=color)
+        ax.set_xlabel('Month', fontsize=11)
+        ax.set_ylabel('Clear Rate (%)', fontsize=11)
+        ax.grid(True, alpha=0.3)
+        ax.set_ylim(min(60, values.min() - 5), 100)
+        plt.setp(ax.xaxis.get_majorticklabels(), rotation=45, ha='right')
+
+        # Annotate start and end
+        last = len(values) - 1
+        ax.text(0, values.iloc[0], f'{values.iloc[0]:.2f}%', fontsize=10, fontweight='bold', ha='right')
+        ax.text(last, values.iloc[last], f'{values.iloc[last]:.2f}%', fontsize=10, fontweight='bold', ha='left')
+
+    fig.suptitle('Control Group Analysis: Document Checks vs Face Checks',
+                 fontsize=16, fontweight='bold', y=1.02)
+
+    return _save(fig, path, dpi)
+
+
+class ChartRenderer:
+    """
+    Renders charts in background worker processes.
+
+    submit() returns immediately; wait() blocks until every chart submitted
+    so far has been written and returns their paths. timings collects one
+    profiling record per rendered chart.
+    """
+
+    def __init__(self, output_dir='.', max_workers=2, dpi=DEFAULT_DPI):
+        self.output_dir = output_dir
+        self.dpi = dpi
+        os.makedirs(output_dir, exist_ok=True)
+        self.pool = ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker)
+        self.futures = []
+        self.timings = []
+
+    def submit(self, plot, filename, *frames):
+        path = os.path.join(self.output_dir, filename)
+        self.futures.append(self.pool.submit(_render, plot, frames, path, self.dpi))
+        return path
+
+    def wait(self):
+        paths = []
+        for future in self.futures:
+            path, record = future.result()
+            paths.append(path)
+            self.timings.append(record)
+        self.futures = []
+        return paths
+
+    def close(self):
+        paths = self.wait()
+        self.pool.shutdown()
+        return paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
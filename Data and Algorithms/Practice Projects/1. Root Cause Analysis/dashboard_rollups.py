@@ -0,0 +1,199 @@
+# Pre-aggregated rollup tables for the monitoring dashboard (Dashboard.js)
+#
+# The pipeline computes these once from the merged reports and writes them
+# as small JSON files; dashboard_server.py only ever reads them, so changing
+# the team or date range on the dashboard never touches raw reports.
+#
+#   pass_rate.json        weekly attempt pass rate
+#   alerts.json           monitor alerts (step #19) per week
+#   subcheck_health.json  per sub-check clear rate over the last 8 weeks vs
+#                         the last 7 days, a status, and 10 health bars
+#   manifest.json         when the rollups were built and the data window
+#
+# Usage: python dashboard_rollups.py [--face ...] [--doc ...] [--out DIR]
+
+import argparse
+import datetime
+import json
+import os
+
+import pandas as pd
+
+from kyc_schema import DOC_REPORTS_CSV, DOC_SUBCHECKS, FACE_REPORTS_CSV, FACE_SUBCHECKS
+from subcheck_rates import period_key
+
+# Next to this file rather than the working directory, so the pipeline and
+# dashboard_server.py agree wherever they are started from
+DEFAULT_ROLLUP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.rca_rollups')
+ROLLUP_TABLES = ['pass_rate', 'alerts', 'subcheck_health']
+
+HEALTH_WINDOW = pd.Timedelta(weeks=8)
+RECENT_WINDOW = pd.Timedelta(days=7)
+HEALTH_BARS = 10
+
+# Status thresholds on last7d - last8w, in percentage points
+CRITICAL_DROP = -10.0
+WARNING_DROP = -2.0
+IMPROVING_RISE = 2.0
+# A health bar is "down" when its bucket's clear rate is this far below the
+# 8-week rate (or the bucket has no reports)
+BAR_TOLERANCE = 5.0
+
+PROJECTS = {
+    **{subcheck: 'document-verification' for subcheck in DOC_SUBCHECKS},
+    **{subcheck: 'face-verification' for subcheck in FACE_SUBCHECKS},
+}
+
+
+def _week_label(periods):
+    return periods.map(lambda p: p.start_time.strftime('%Y-%m-%d'))
+
+
+def weekly_pass_rate(merged_df, time_col='created_at_face'):
+    """Attempts, passes and pass rate (%) per week, oldest first."""
+    week = period_key(merged_df[time_col], 'week').rename('week')
+    weekly = merged_df.groupby(week, observed=True)['attempt_passed'].agg(['size', 'sum', 'mean'])
+    return pd.DataFrame({
+        'week': _week_label(weekly.index),
+        'attempts': weekly['size'].to_numpy(),
+        'passed': weekly['sum'].astype(int).to_numpy(),
+        'passRate': (weekly['mean'] * 100).round(1).to_numpy(),
+    })
+
+
+def weekly_alerts(alerts, weeks):
+    """Number of monitor alerts raised in each week label of weeks."""
+    counts = pd.Series(0, index=pd.Index(weeks, name='week'))
+    if alerts:
+        hours = pd.to_datetime(pd.Series([a['hour'] for a in alerts]))
+        alert_weeks = _week_label(period_key(hours, 'week')).value_counts()
+        counts = counts.add(alert_weeks, fill_value=0).astype(int)
+    return pd.DataFrame({
+        'week': counts.index,
+        'date': [f'{d:%b} {d.day}' for d in pd.to_datetime(counts.index)],
+        'alerts': counts.to_numpy(),
+    })
+
+
+def _clear_rate(clear, total):
+    return None if total == 0 else round(clear / total * 100, 1)
+
+
+def _status(difference):
+    if difference is None:
+        return 'unknown'
+    if difference <= CRITICAL_DROP:
+        return 'critical'
+    if difference <= WARNING_DROP:
+        return 'warning'
+    if difference >= IMPROVING_RISE:
+        return 'improving'
+    return 'healthy'
+
+
+def subcheck_health(merged_df, end=None, time_col='created_at_face'):
+    """
+    One row per sub-check, as the dashboard's subCheckHealth table.
+
+    last8w and last7d are clear rates (%) over the 8 weeks and 7 days up to
+    end (default: the last report). bars splits the 8 weeks into 10 equal
+    buckets, 1 where the bucket's clear rate is within BAR_TOLERANCE points
+    of last8w.
+    """
+    end = merged_df[time_col].max() if end is None else pd.Timestamp(end)
+    start = end - HEALTH_WINDOW
+    window = merged_df[(merged_df[time_col] > start) & (merged_df[time_col] <= end)]
+
+    subchecks = [c for c in PROJECTS if c in merged_df.columns]
+    results = window[subchecks]
+    clear, total = results.eq('clear'), results.notna()
+
+    recent = window[time_col] > end - RECENT_WINDOW
+    bucket = ((window[time_col] - start) / HEALTH_WINDOW * HEALTH_BARS).astype(int).clip(0, HEALTH_BARS - 1)
+    buckets = range(HEALTH_BARS)
+    bucket_clear = clear.groupby(bucket).sum().reindex(buckets, fill_value=0)
+    bucket_total = total.groupby(bucket).sum().reindex(buckets, fill_value=0)
+
+    rows = []
+    for subcheck in subchecks:
+        last8w = _clear_rate(clear[subcheck].sum(), total[subcheck].sum())
+        last7d = _clear_rate(clear.loc[recent, subcheck].sum(), total.loc[recent, subcheck].sum())
+        difference = None if last8w is None or last7d is None else round(last7d - last8w, 1)
+
+        bars = []
+        for bar_clear, bar_total in zip(bucket_clear[subcheck], bucket_total[subcheck]):
+            rate = _clear_rate(bar_clear, bar_total)
+            bars.append(int(rate is not None and last8w is not None and rate >= last8w - BAR_TOLERANCE))
+
+        rows.append({
+            'check': subcheck,
+            'project': PROJECTS[subcheck],
+            'last8w': last8w,
+            'last7d': last7d,
+            'difference': difference,
+            'status': _status(difference),
+            'reports8w': int(total[subcheck].sum()),
+            'reports7d': int(total.loc[recent, subcheck].sum()),
+            'bars': bars,
+        })
+    return pd.DataFrame(rows)
+
+
+def build_rollups(merged_df, alerts, time_col='created_at_face'):
+    """All rollup tables, keyed by name, from the merged frame and monitor alerts."""
+    pass_rate = weekly_pass_rate(merged_df, time_col)
+    return {
+        'pass_rate': pass_rate,
+        'alerts': weekly_alerts(alerts, pass_rate['week']),
+        'subcheck_health': subcheck_health(merged_df, time_col=time_col),
+    }
+
+
+def write_rollups(rollups, rollup_dir=DEFAULT_ROLLUP_DIR, data_end=None):
+    """
+    Write each table as <name>.json (a list of records) plus manifest.json.
+    Files are replaced atomically, so the server never reads half a table.
+    """
+    os.makedirs(rollup_dir, exist_ok=True)
+    for name, table in rollups.items():
+        # NaN is not valid JSON; missing rates are written as null
+        records = table.astype(object).where(table.notna(), None).to_dict(orient='records')
+        _write_json(os.path.join(rollup_dir, f'{name}.json'), records)
+    _write_json(os.path.join(rollup_dir, 'manifest.json'), {
+        'built_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'data_end': None if data_end is None else str(data_end),
+        'tables': sorted(rollups),
+    })
+    return rollup_dir
+
+
+def _write_json(path, payload):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f, default=str, allow_nan=False)
+    os.replace(tmp_path, path)
+
+
+class _DiscardSink:
+    def send(self, alert):
+        pass
+
+
+if __name__ == '__main__':
+    from analysis_stages import build_merged_frame
+    from monitor import KYCSubCheckMonitor, min_reports_for
+
+    parser = argparse.ArgumentParser(description='Write the dashboard rollup tables')
+    parser.add_argument('--face', default=FACE_REPORTS_CSV)
+    parser.add_argument('--doc', default=DOC_REPORTS_CSV)
+    parser.add_argument('--out', default=DEFAULT_ROLLUP_DIR)
+    args = parser.parse_args()
+
+    merged_df = build_merged_frame(args.face, args.doc)
+    monitor = KYCSubCheckMonitor(sink=_DiscardSink(), min_reports=min_reports_for(merged_df))
+    alerts = monitor.replay(merged_df)
+    rollups = build_rollups(merged_df, alerts)
+    write_rollups(rollups, args.out, merged_df['created_at_face'].max())
+    for name, table in rollups.items():
+        print(f"{name}: {len(table)} rows")
+    print(f"Rollups written to {args.out}")
@@ -0,0 +1,218 @@
+# Local JSON API for Dashboard.js, served from the rollup tables
+#
+# dashboard_rollups.py writes small pre-aggregated tables; this server loads
+# them once, filters them per request (team, date range) and never touches
+# raw reports. Every distinct response body is rendered once and cached with
+# a strong ETag, so the browser's revalidation on a filter or tab switch is
+# answered with 304 Not Modified. The tables are reloaded (and the response
+# cache dropped) when manifest.json changes, i.e. after the next pipeline run.
+#
+#   GET /api/dashboard?team=...&range=...     all three series at once
+#   GET /api/pass-rate?range=...              passRateData
+#   GET /api/alerts?range=...                 alertsData
+#   GET /api/subcheck-health?team=...         subCheckHealth
+#   GET /api/manifest                         when the rollups were built
+#
+# Usage: python dashboard_server.py [--rollups DIR] [--port 8050]
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from dashboard_rollups import DEFAULT_ROLLUP_DIR, ROLLUP_TABLES
+
+# Dashboard.js selectedTeam values -> sub-check projects shown
+TEAMS = {
+    'kyc-verification': None,  # every project
+    'document-team': {'document-verification'},
+    'face-team': {'face-verification'},
+}
+# Dashboard.js dateRange values -> days of weekly series kept, counted back
+# from the end of the data
+RANGES = {
+    'last-8-weeks': 56,
+    'last-4-weeks': 28,
+    'last-month': 31,
+}
+DEFAULT_TEAM = 'kyc-verification'
+DEFAULT_RANGE = 'last-8-weeks'
+
+
+class RequestError(Exception):
+    """A bad query parameter; reported to the client as 400."""
+
+
+class RollupStore:
+    """The rollup tables in memory, plus the rendered responses by query."""
+
+    def __init__(self, rollup_dir=DEFAULT_ROLLUP_DIR):
+        self.rollup_dir = rollup_dir
+        self.lock = threading.Lock()
+        self.version = None
+        self.tables = {}
+        self.manifest = {}
+        self.responses = {}
+
+    def _path(self, name):
+        return os.path.join(self.rollup_dir, f'{name}.json')
+
+    def refresh(self):
+        """Reload the tables if manifest.json changed since the last load."""
+        version = os.stat(self._path('manifest')).st_mtime_ns
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            tables = {}
+            for name in ROLLUP_TABLES:
+                with open(self._path(name)) as f:
+                    tables[name] = json.load(f)
+            with open(self._path('manifest')) as f:
+                self.manifest = json.load(f)
+            self.tables = tables
+            self.responses = {}
+            self.version = version
+
+    def _weeks(self, table, date_range):
+        if date_range not in RANGES:
+            raise RequestError(f"Unknown range {date_range!r}, expected one of {sorted(RANGES)}")
+        rows = self.tables[table]
+        if not rows:
+            return []
+        end = self.manifest.get('data_end') or rows[-1]['week']
+        cutoff = datetime.date.fromisoformat(end[:10]) - datetime.timedelta(days=RANGES[date_range])
+        return [r for r in rows if datetime.date.fromisoformat(r['week']) > cutoff]
+
+    def pass_rate(self, date_range):
+        return [{'week': r['week'], 'passRate': r['passRate'], 'attempts': r['attempts']}
+                for r in self._weeks('pass_rate', date_range)]
+
+    def alerts(self, date_range):
+        return [{'date': r['date'], 'alerts': r['alerts']} for r in self._weeks('alerts', date_range)]
+
+    def subcheck_health(self, team):
+        if team not in TEAMS:
+            raise RequestError(f"Unknown team {team!r}, expected one of {sorted(TEAMS)}")
+        projects = TEAMS[team]
+        return [r for r in self.tables['subcheck_health'] if projects is None or r['project'] in projects]
+
+    def payload(self, endpoint, team, date_range):
+        if endpoint == 'dashboard':
+            return {
+                'passRateData': self.pass_rate(date_range),
+                'alertsData': self.alerts(date_range),
+                'subCheckHealth': self.subcheck_health(team),
+                'builtAt': self.manifest.get('built_at'),
+            }
+        if endpoint == 'pass-rate':
+            return self.pass_rate(date_range)
+        if endpoint == 'alerts':
+            return self.alerts(date_range)
+        if endpoint == 'subcheck-health':
+            return self.subcheck_health(team)
+        if endpoint == 'manifest':
+            return self.manifest
+        return None
+
+    def response(self, endpoint, team, date_range):
+        """(body, etag) for a request, rendered once per query and rollup version."""
+        self.refresh()
+        # The version is part of the key so a response rendered from the old
+        # tables during a reload is never served as current
+        key = (self.version, endpoint, team, date_range)
+        cached = self.responses.get(key)
+        if cached is None:
+            payload = self.payload(endpoint, team, date_range)
+            if payload is None:
+                return None
+            body = json.dumps(payload, separators=(',', ':')).encode()
+            cached = (body, '"' + hashlib.sha1(body).hexdigest()[:20] + '"')
+            self.responses[key] = cached
+        return cached
+
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(',')]
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
+class DashboardHandler(BaseHTTPRequestHandler):
+    store = None  # set by make_server
+
+    def _send(self, status, body=b'', etag=None):
+        self.send_response(status)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', 'ETag')
+        # Always revalidate, and let the ETag make that cheap
+        self.send_header('Cache-Control', 'no-cache')
+        if etag:
+            self.send_header('ETag', etag)
+        if body:
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, json.dumps({'error': message}).encode())
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if not url.path.startswith('/api/'):
+            return self._error(404, f'No such endpoint {url.path}')
+        query = parse_qs(url.query)
+        team = query.get('team', [DEFAULT_TEAM])[0]
+        date_range = query.get('range', [DEFAULT_RANGE])[0]
+        # Parameters an endpoint ignores must not split its cache entries
+        endpoint = url.path[len('/api/'):].strip('/')
+        if endpoint in ('pass-rate', 'alerts', 'manifest'):
+            team = DEFAULT_TEAM
+        if endpoint in ('subcheck-health', 'manifest'):
+            date_range = DEFAULT_RANGE
+
+        try:
+            response = self.store.response(endpoint, team, date_range)
+        except RequestError as e:
+            return self._error(400, str(e))
+        except FileNotFoundError:
+            return self._error(503, f'No rollups in {self.store.rollup_dir}; run dashboard_rollups.py')
+        if response is None:
+            return self._error(404, f'No such endpoint {url.path}')
+
+        body, etag = response
+        if _etag_matches(self.headers.get('If-None-Match'), etag):
+            return self._send(304, etag=etag)
+        self._send(200, body, etag)
+
+    do_HEAD = do_GET
+
+
+def make_server(rollup_dir=DEFAULT_ROLLUP_DIR, host='127.0.0.1', port=8050):
+    handler = type('Handler', (DashboardHandler,), {'store': RollupStore(rollup_dir)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve the dashboard rollups as JSON')
+    parser.add_argument('--rollups', default=DEFAULT_ROLLUP_DIR)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    args = parser.parse_args()
+
+    server = make_server(args.rollups, args.host, args.port)
+    print(f"Serving {args.rollups} on http://{args.host}:{args.port}/api/dashboard")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,81 @@
+# Vectorised failure classification (steps #10 and #13)
+
+import numpy as np
+import pandas as pd
+
+from kyc_schema import DOC_SUBCHECKS
+
+
+def categorise_failure(row):
+    """
+    Categorise each failed attempt by which check(s) failed.
+
+    Row-wise reference version, kept for the benchmark and as the
+    specification categorise_failures has to match.
+
+    Returns:
+        - 'doc_only': Document check failed, face check passed
+        - 'face_only': Face check failed, document check passed
+        - 'both_failed': Both checks failed
+        - 'missing_data': One or both checks missing (data quality issue)
+    """
+    face_failed = row['result_face'] != 'clear'
+    doc_failed = row['result_doc'] != 'clear'
+
+    if pd.isna(row['result_face']) or pd.isna(row['result_doc']):
+        return 'missing_data'
+    elif face_failed and doc_failed:
+        return 'both_failed'
+    elif face_failed:
+        return 'face_only'
+    elif doc_failed:
+        return 'doc_only'
+    else:
+        return 'unknown'
+
+
+def categorise_failures(df, face_col='result_face', doc_col='result_doc'):
+    """
+    Categorise every row of df in one pass using column-wise boolean masks.
+
+    Returns the same labels as categorise_failure applied row by row, as a
+    Series aligned to df's index.
+    """
+    face = df[face_col]
+    doc = df[doc_col]
+    face_failed = face.ne('clear').to_numpy()
+    doc_failed = doc.ne('clear').to_numpy()
+    missing = (face.isna() | doc.isna()).to_numpy()
+
+    # np.select takes the first matching condition, mirroring the if/elif chain
+    labels = np.select(
+        [missing, face_failed & doc_failed, face_failed, doc_failed],
+        ['missing_data', 'both_failed', 'face_only', 'doc_only'],
+        default='unknown',
+    )
+    return pd.Series(labels, index=df.index, name='failure_type')
+
+
+def subcheck_failure_breakdown(df, subchecks=DOC_SUBCHECKS):
+    """
+    Step #13 without the per-sub-check loop: count non-clear results for
+    every sub-check at once.
+
+    Returns:
+        DataFrame indexed by sub-check with a 'total_non_clear' column
+        (NaN counts as non-clear, as in step #13) followed by one column per
+        non-clear value. Sub-checks with no non-clear rows are dropped.
+    """
+    subchecks = [c for c in subchecks if c in df.columns]
+    results = df[subchecks]
+    non_clear = results.ne('clear')
+
+    values = results.where(non_clear).stack()
+    counts = (
+        values.groupby(level=1).value_counts().unstack(fill_value=0)
+        .reindex(subchecks, fill_value=0)
+    )
+    counts.insert(0, 'total_non_clear', non_clear.sum())
+    counts.index.name = 'subcheck'
+    counts.columns.name = None
+    return counts[counts['total_non_clear'] > 0]
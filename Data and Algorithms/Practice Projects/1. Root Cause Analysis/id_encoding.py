@@ -0,0 +1,180 @@
+# Fixed-width 128-bit encoding of the 32-hex-character report IDs
+#
+# user_id and attempt_id are 32 hex characters, i.e. exactly 128 bits. As
+# Python strings each one costs ~80 bytes plus a pointer, and every merge or
+# groupby has to hash it. encode_id_columns replaces each ID column with two
+# uint64 columns, <column>_hi and <column>_lo (16 bytes + a null mask), so
+# joins and groupbys compare integers instead.
+#
+# The encoding is exact and big-endian, so it keeps the sort order of the
+# hex strings and needs no lookup table: decode_ids turns the codes back
+# into lowercase hex. Decode only the small results you report, e.g. the
+# index of a groupby, never the full frame.
+#
+# The columns use pandas' nullable UInt64 dtype, so the missing side of an
+# outer merge stays <NA> instead of turning the codes into float64 (which
+# would lose precision above 2**53).
+#
+# Usage: python id_encoding.py [--rows 1000000]  (string vs encoded benchmark)
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from kyc_schema import ID_COLUMNS, MERGE_SUFFIXES
+
+ID_HEX_LENGTH = 32
+
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+_HEX_VALUES = np.full(256, 255, dtype=np.uint8)
+_HEX_VALUES[_HEX_DIGITS] = np.arange(16, dtype=np.uint8)
+_HEX_VALUES[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16, dtype=np.uint8)
+
+
+def code_columns(column):
+    """Names of the two code columns that replace an encoded ID column."""
+    return [f'{column}_hi', f'{column}_lo']
+
+
+def is_encoded(df, column):
+    """Whether df holds column as codes, with or without a merge suffix."""
+    candidates = [column] + [column + suffix for suffix in MERGE_SUFFIXES]
+    return not any(c in df.columns for c in candidates)
+
+
+def id_columns(df, column):
+    """The columns that hold an ID in df: [column] or its two code columns."""
+    return code_columns(column) if is_encoded(df, column) else [column]
+
+
+def encode_ids(values):
+    """
+    Encode 32-hex-character IDs as 128-bit integers.
+
+    Args:
+        values: Sequence of hex strings; NaN/None are allowed.
+
+    Returns:
+        (hi, lo, missing): two uint64 arrays holding the high and low 64
+        bits, and a boolean array marking the missing IDs (whose codes are 0).
+
+    Raises:
+        ValueError: If an ID is not 32 hex characters.
+    """
+    values = pd.Series(values, copy=False)
+    missing = values.isna().to_numpy()
+    filled = values.where(~missing, '0' * ID_HEX_LENGTH)
+
+    # Checked first: the fixed-width conversion below would truncate longer IDs
+    bad_length = filled.str.len().to_numpy() != ID_HEX_LENGTH
+    if bad_length.any():
+        raise ValueError(f'{bad_length.sum()} IDs are not {ID_HEX_LENGTH} characters, '
+                         f'e.g. {filled[bad_length].iloc[0]!r}')
+    try:
+        raw = np.asarray(filled.to_numpy(), dtype=f'S{ID_HEX_LENGTH}')
+    except UnicodeEncodeError:
+        raise ValueError('IDs must be ASCII hex strings')
+
+    nibbles = _HEX_VALUES[raw.view(np.uint8).reshape(-1, ID_HEX_LENGTH)]
+    bad_chars = (nibbles == 255).any(axis=1)
+    if bad_chars.any():
+        raise ValueError(f'{bad_chars.sum()} IDs are not hexadecimal, e.g. {filled[bad_chars].iloc[0]!r}')
+
+    packed = np.ascontiguousarray((nibbles[:, 0::2] << 4) | nibbles[:, 1::2])
+    words = packed.view('>u8')
+    return words[:, 0].astype(np.uint64), words[:, 1].astype(np.uint64), missing
+
+
+def decode_ids(hi, lo):
+    """Lowercase 32-hex-character strings for uint64 hi/lo codes."""
+    hi = np.asarray(hi, dtype=np.uint64)
+    words = np.empty((len(hi), 2), dtype='>u8')
+    words[:, 0] = hi
+    words[:, 1] = np.asarray(lo, dtype=np.uint64)
+    octets = words.view(np.uint8).reshape(len(hi), ID_HEX_LENGTH // 2)
+
+    chars = np.empty((len(hi), ID_HEX_LENGTH), dtype=np.uint8)
+    chars[:, 0::2] = _HEX_DIGITS[octets >> 4]
+    chars[:, 1::2] = _HEX_DIGITS[octets & 15]
+    return chars.view(f'S{ID_HEX_LENGTH}').ravel().astype(str).astype(object)
+
+
+def encode_id_columns(df, columns=ID_COLUMNS):
+    """
+    Replace each hex ID column of df (in place) with its two code columns,
+    at the same position. Columns that are absent are skipped.
+    """
+    for column in columns:
+        if column not in df.columns:
+            continue
+        hi, lo, missing = encode_ids(df[column])
+        position = df.columns.get_loc(column)
+        df.drop(columns=column, inplace=True)
+        for offset, (name, codes) in enumerate(zip(code_columns(column), (hi, lo))):
+            df.insert(position + offset, name, pd.arrays.IntegerArray(codes, missing.copy()))
+    return df
+
+
+def decode_id_column(df, column):
+    """The hex strings for an encoded ID column of df, with NaN where missing."""
+    hi_name, lo_name = code_columns(column)
+    hi, lo = df[hi_name], df[lo_name]
+    missing = hi.isna().to_numpy()
+    decoded = decode_ids(hi.fillna(0).to_numpy(dtype=np.uint64), lo.fillna(0).to_numpy(dtype=np.uint64))
+    decoded[missing] = np.nan
+    return pd.Series(decoded, index=df.index, name=column)
+
+
+def _random_ids(n, rng):
+    return pd.Series(decode_ids(rng.integers(0, 2 ** 64, n, dtype=np.uint64),
+                                rng.integers(0, 2 ** 64, n, dtype=np.uint64)))
+
+
+def _time(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def benchmark(rows, users, seed=0):
+    """Memory, merge and groupby time with hex string keys vs encoded keys."""
+    rng = np.random.default_rng(seed)
+    attempt_ids = _random_ids(rows, rng)
+    user_ids = _random_ids(users, rng).iloc[rng.integers(0, users, rows)].reset_index(drop=True)
+    face = pd.DataFrame({'user_id': user_ids, 'attempt_id': attempt_ids, 'score': rng.random(rows)})
+    doc = face.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+    encode_s, (face_codes, doc_codes) = _time(
+        lambda: (encode_id_columns(face.copy()), encode_id_columns(doc.copy())))
+
+    results = []
+    for label, left, right, on, by in [
+        ('hex strings', face, doc, ['attempt_id'], ['user_id']),
+        ('uint64 codes', face_codes, doc_codes, code_columns('attempt_id'), code_columns('user_id')),
+    ]:
+        merge_s, merged = _time(lambda: pd.merge(left, right, on=on, suffixes=MERGE_SUFFIXES, how='outer'))
+        groupby_s, _ = _time(lambda: left.groupby(by)['score'].agg(['count', 'mean']))
+        results.append({
+            'keys': label,
+            'key_mb': left[on + by].memory_usage(deep=True, index=False).sum() / 1e6,
+            'merge_s': round(merge_s, 3),
+            'merge_rows_per_s': round(len(merged) / merge_s),
+            'groupby_s': round(groupby_s, 3),
+        })
+    table = pd.DataFrame(results).set_index('keys')
+    table.attrs['encode_s'] = round(encode_s, 3)
+    return table
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare hex string and 128-bit encoded ID keys')
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=None, help='distinct user_ids (default rows // 3)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    table = benchmark(args.rows, args.users or max(1, args.rows // 3), args.seed)
+    print(table.to_string())
+    print(f"\nEncoding both frames took {table.attrs['encode_s']}s")
@@ -0,0 +1,259 @@
+# Incremental re-analysis: fold only new report rows into persisted aggregates
+#
+# The daily run keeps its aggregate state in a directory on disk:
+#   - daily attempt and sub-check clear/total counts (a StreamingAggregates
+#     at 'day' granularity, which rolls up to week or month on demand)
+#   - per-user attempt counts and pass flags (step #7)
+#   - a created_at watermark: everything at or before it has been counted
+#   - per-file byte offsets, so an export that is only ever appended to is
+#     read from where the last run stopped instead of from the start
+#   - pending rows: reports newer than the watermark that could not be
+#     counted yet because their partner report may still be on its way
+#
+# Face and doc reports of one attempt are written within a second or two of
+# each other. A run only counts up to a cutoff, the latest created_at seen
+# in *both* files; a merged attempt with both reports is counted once it is
+# at or before the cutoff, and an attempt with only one report once it is
+# more than match_window older than the cutoff. Everything else is kept as
+# pending for the next run. This way an attempt is never counted half-joined,
+# and the totals match a full recompute over the same rows.
+#
+# Rows that turn up at or before the watermark after it has passed them are
+# treated as already counted.
+#
+# Usage: python incremental.py --state-dir .rca_state [--face ...] [--doc ...]
+
+import argparse
+import io
+import json
+import os
+import zlib
+
+import pandas as pd
+
+from kyc_schema import DOC_REPORTS_CSV, FACE_REPORTS_CSV, MERGE_KEY, MERGE_SUFFIXES
+from report_cache import parse_reports
+from streaming import StreamingAggregates
+from subcheck_rates import clear_rates_from_counts
+
+STATE_VERSION = 1
+DEFAULT_MATCH_WINDOW = pd.Timedelta(hours=1)
+FINGERPRINT_BYTES = 4096
+
+
+def _fingerprint(f, end):
+    """Checksum of the bytes just before end, to detect rewritten files."""
+    start = max(0, end - FINGERPRINT_BYTES)
+    f.seek(start)
+    return zlib.crc32(f.read(end - start))
+
+
+def read_new_rows(path, source, watermark):
+    """
+    Read the rows of a report CSV that are newer than watermark.
+
+    If the file still starts with what was read last time (same bytes before
+    the stored offset), only the appended tail is parsed; otherwise the whole
+    file is scanned.
+
+    Returns:
+        (DataFrame of new rows, updated source record)
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        size = f.seek(0, os.SEEK_END)
+
+        offset = len(header)
+        if source and source['offset'] <= size and _fingerprint(f, source['offset']) == source['fingerprint']:
+            offset = source['offset']
+
+        f.seek(offset)
+        data = f.read()
+
+    # Leave any half-written last line for the next run
+    complete = data.rfind(b'\n') + 1
+    end = offset + complete
+    new_rows = parse_reports(pd.read_csv(io.BytesIO(header + data[:complete])))
+    if watermark is not None:
+        new_rows = new_rows[new_rows['created_at'] > watermark]
+
+    with open(path, 'rb') as f:
+        fingerprint = _fingerprint(f, end)
+    return new_rows, {'offset': end, 'fingerprint': fingerprint}
+
+
+class IncrementalState:
+    """Aggregates, watermark, source offsets and pending rows for one pipeline."""
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.aggregates = StreamingAggregates(granularity='day')
+        self.users = pd.DataFrame({
+            'num_attempts': pd.Series(dtype='int64'),
+            'user_passed': pd.Series(dtype='bool'),
+        })
+        self.users.index.name = 'user_id'
+        self.watermark = None
+        self.sources = {}
+        self.pending = {'face': None, 'doc': None}
+
+    # Persistence -----------------------------------------------------------
+
+    def _path(self, name):
+        return os.path.join(self.state_dir, name)
+
+    @classmethod
+    def load(cls, state_dir):
+        state = cls(state_dir)
+        meta_path = state._path('state.json')
+        if not os.path.exists(meta_path):
+            return state
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != STATE_VERSION:
+            raise ValueError(f"{state_dir} holds state version {meta.get('version')}, "
+                             f"expected {STATE_VERSION}; delete it to recompute")
+
+        state.watermark = pd.Timestamp(meta['watermark']) if meta['watermark'] else None
+        state.sources = meta['sources']
+        state.aggregates = pd.read_pickle(state._path('aggregates.pkl'))
+        state.users = pd.read_pickle(state._path('users.pkl'))
+        for side in state.pending:
+            if os.path.exists(state._path(f'pending_{side}.pkl')):
+                state.pending[side] = pd.read_pickle(state._path(f'pending_{side}.pkl'))
+        return state
+
+    def save(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        pd.to_pickle(self.aggregates, self._path('aggregates.pkl'))
+        pd.to_pickle(self.users, self._path('users.pkl'))
+        for side, rows in self.pending.items():
+            if rows is not None:
+                pd.to_pickle(rows, self._path(f'pending_{side}.pkl'))
+        # state.json goes last: until it is replaced, the previous run's
+        # watermark and offsets still describe a consistent state
+        tmp_path = self._path('state.json.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': STATE_VERSION,
+                'watermark': str(self.watermark) if self.watermark is not None else None,
+                'sources': self.sources,
+            }, f)
+        os.replace(tmp_path, self._path('state.json'))
+
+    # Folding in new rows ---------------------------------------------------
+
+    def fold(self, merged_df):
+        """Add a batch of merged attempts to every aggregate."""
+        merged_df = merged_df.copy()
+        merged_df['attempt_passed'] = (
+            (merged_df['result_face'] == 'clear') &
+            (merged_df['result_doc'] == 'clear')
+        )
+        self.aggregates.update(merged_df)
+
+        user_id = merged_df['user_id_face'].fillna(merged_df['user_id_doc']).rename('user_id')
+        users = merged_df.groupby(user_id).agg({
+            'attempt_id': 'count',
+            'attempt_passed': 'any'
+        }).rename(columns={'attempt_id': 'num_attempts', 'attempt_passed': 'user_passed'})
+
+        combined = self.users.reindex(self.users.index.union(users.index))
+        new = users.reindex(combined.index)
+        combined['num_attempts'] = combined['num_attempts'].fillna(0) + new['num_attempts'].fillna(0)
+        combined['user_passed'] = (combined['user_passed'].astype('boolean').fillna(False)
+                                   | new['user_passed'].astype('boolean').fillna(False))
+        combined['num_attempts'] = combined['num_attempts'].astype('int64')
+        combined['user_passed'] = combined['user_passed'].astype(bool)
+        combined.index.name = 'user_id'
+        self.users = combined
+
+    def update(self, face_path=FACE_REPORTS_CSV, doc_path=DOC_REPORTS_CSV,
+               match_window=DEFAULT_MATCH_WINDOW):
+        """
+        Read what is new in both report files, count every attempt that is
+        complete up to the cutoff and keep the rest pending.
+
+        Returns:
+            Number of merged attempts folded in by this run.
+        """
+        new_rows = {}
+        for side, path in (('face', face_path), ('doc', doc_path)):
+            rows, self.sources[side] = read_new_rows(path, self.sources.get(side), self.watermark)
+            if self.pending[side] is not None:
+                # A rescanned file can return pending rows again; keep one copy
+                rows = pd.concat([self.pending[side], rows], ignore_index=True)
+                rows = rows.drop_duplicates(MERGE_KEY, keep='last')
+            new_rows[side] = rows
+
+        if new_rows['face'].empty or new_rows['doc'].empty:
+            self.pending = new_rows
+            return 0
+        cutoff = min(new_rows['face']['created_at'].max(), new_rows['doc']['created_at'].max())
+
+        merged_df = pd.merge(new_rows['face'], new_rows['doc'], on=MERGE_KEY,
+                             suffixes=MERGE_SUFFIXES, how='outer')
+        both = merged_df['created_at_face'].notna() & merged_df['created_at_doc'].notna()
+        earliest = merged_df[['created_at_face', 'created_at_doc']].min(axis=1)
+        latest = merged_df[['created_at_face', 'created_at_doc']].max(axis=1)
+        ready = (both & (latest <= cutoff)) | (~both & (earliest <= cutoff - match_window))
+
+        self.fold(merged_df[ready])
+
+        waiting = set(merged_df.loc[~ready, MERGE_KEY])
+        self.pending = {
+            side: rows[rows[MERGE_KEY].isin(waiting)].reset_index(drop=True)
+            for side, rows in new_rows.items()
+        }
+        self.watermark = cutoff if self.watermark is None else max(self.watermark, cutoff)
+        return int(ready.sum())
+
+    # Results -------------------------------------------------------------------
+
+    def monthly_stats(self, granularity='M'):
+        """Step #8's monthly_stats, rolled up from the daily counts."""
+        daily = self.aggregates.attempts
+        stats = daily.groupby(daily.index.asfreq(granularity)).sum().astype('int64')
+        stats['pass_rate'] = (stats['passed_attempts'] / stats['total_attempts']).round(4)
+        stats.index.name = 'month'
+        return stats
+
+    def subcheck_clear_rates(self, granularity='M'):
+        """Sub-check clear rates (%), rolled up from the daily counts."""
+        daily = self.aggregates.subcheck
+        rates = clear_rates_from_counts(daily.groupby(daily.index.asfreq(granularity)).sum())
+        rates.index.name = 'month'
+        return rates
+
+    def user_attempts(self):
+        """Step #7's user_attempts."""
+        return self.users.sort_index()
+
+
+def run_incremental(state_dir, face_path=FACE_REPORTS_CSV, doc_path=DOC_REPORTS_CSV,
+                    match_window=DEFAULT_MATCH_WINDOW):
+    """Load the state in state_dir, fold in new rows, save it and return it."""
+    state = IncrementalState.load(state_dir)
+    state.update(face_path, doc_path, match_window)
+    state.save()
+    return state
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Fold new report rows into the saved analysis state')
+    parser.add_argument('--state-dir', default='.rca_state')
+    parser.add_argument('--face', default=FACE_REPORTS_CSV)
+    parser.add_argument('--doc', default=DOC_REPORTS_CSV)
+    parser.add_argument('--match-window-minutes', type=int, default=60)
+    args = parser.parse_args()
+
+    state = IncrementalState.load(args.state_dir)
+    folded = state.update(args.face, args.doc, pd.Timedelta(minutes=args.match_window_minutes))
+    state.save()
+
+    print(f"Folded in {folded} attempts; watermark now {state.watermark}")
+    print(f"Pending: {sum(len(r) for r in state.pending.values() if r is not None)} report rows")
+    print("\nMonthly pass rate:")
+    print(state.monthly_stats())
+    print(f"\nUser-level pass rate: {state.users['user_passed'].mean():.2%}")
@@ -0,0 +1,55 @@
+# Column layout shared by the Root Cause Analysis helpers
+
+FACE_REPORTS_CSV = 'face_reports_sample.csv'
+DOC_REPORTS_CSV = 'doc_reports_sample.csv'
+
+# Both report files are joined on attempt_id (step #4)
+MERGE_KEY = 'attempt_id'
+MERGE_SUFFIXES = ('_face', '_doc')
+
+# 32-hex-character IDs that id_encoding can store as 128-bit codes
+ID_COLUMNS = ['user_id', 'attempt_id']
+
+# Sub-checks as they are named *after* the merge. visual_authenticity_result
+# exists in both files, so it picks up a suffix on each side.
+DOC_SUBCHECKS = [
+    'visual_authenticity_result_doc',
+    'image_integrity_result',
+    'face_detection_result',
+    'image_quality_result',
+    'supported_document_result',
+    'conclusive_document_quality_result',
+    'colour_picture_result',
+    'data_validation_result',
+    'data_consistency_result',
+    'data_comparison_result',
+    'police_record_result',
+    'compromised_document_result',
+]
+
+FACE_SUBCHECKS = [
+    'visual_authenticity_result_face',
+    'face_comparison_result',
+    'facial_image_integrity_result',
+]
+
+# Overall verdicts, not sub-checks. sub_result is the document report's
+# own summary (clear / caution / rejected / suspected).
+OVERALL_RESULTS = ['result_face', 'result_doc', 'sub_result']
+
+
+def subcheck_columns(columns):
+    """
+    Return every sub-check *_result column present in a merged frame,
+    in a stable order (document checks first, then face checks).
+
+    Columns that are not in the known lists but still end in '_result'
+    are appended, so new sub-checks in an export are not silently dropped.
+    """
+    columns = list(columns)
+    known = [c for c in DOC_SUBCHECKS + FACE_SUBCHECKS if c in columns]
+    extra = [
+        c for c in columns
+        if c.endswith('_result') and c not in known and c not in OVERALL_RESULTS
+    ]
+    return known + extra
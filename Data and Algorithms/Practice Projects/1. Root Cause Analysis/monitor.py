@@ -0,0 +1,264 @@
+# Real-time sub-check monitoring (step #19)
+#
+# Each sub-check keeps a ring buffer of hourly clear/total counters covering
+# the 7-day baseline, the last complete hour and the hour in progress, plus
+# running sums over the whole ring. Recording a report touches one slot and
+# the running sums; moving to a new hour zeroes the slot being reused and
+# subtracts it from the sums. Both the last-hour rate and the 7-day baseline
+# are then read off in constant time, with no rescan of past reports.
+
+import json
+import sys
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from kyc_schema import subcheck_columns
+from subcheck_rates import subcheck_counts
+
+BASELINE_HOURS = 7 * 24
+
+# Doc-only attempts have no face check, so their created_at_face is NaT
+FALLBACK_TIME_COL = 'created_at_doc'
+
+
+def epoch_hour(timestamp):
+    """Whole hours since the epoch for a datetime, Timestamp or string."""
+    return int(pd.Timestamp(timestamp).timestamp() // 3600)
+
+
+def report_times(reports, time_col='created_at_face'):
+    """
+    Timestamp of each merged report: time_col, or created_at_doc where
+    time_col is missing. Takes a frame (returns a Series) or a single
+    report as a dict or Series (returns a scalar, NaT if neither is set).
+    """
+    times = reports[time_col]
+    if FALLBACK_TIME_COL not in reports.keys():
+        return times
+    if isinstance(times, pd.Series):
+        return times.fillna(reports[FALLBACK_TIME_COL])
+    return reports[FALLBACK_TIME_COL] if pd.isna(times) else times
+
+
+def min_reports_for(df, time_col='created_at_face', quantile=0.99):
+    """
+    A min_reports floor that suits a given sample: the quantile of reports
+    per hour, so only the busier hours of a small export are judged.
+    """
+    per_hour = report_times(df, time_col).dropna().dt.floor('h').value_counts()
+    return max(1, int(per_hour.quantile(quantile))) if len(per_hour) else 1
+
+
+def hour_label(hour):
+    return datetime.fromtimestamp(hour * 3600, tz=timezone.utc).strftime('%Y-%m-%d %H:00')
+
+
+class HourlyRing:
+    """
+    Hourly clear/total counters for one sub-check.
+
+    Slots hold the current hour, the last complete hour and baseline_hours
+    hours before that. Counts for hours that have fallen out of the ring are
+    dropped.
+    """
+
+    def __init__(self, baseline_hours=BASELINE_HOURS):
+        self.size = baseline_hours + 2
+        self.clear = [0] * self.size
+        self.total = [0] * self.size
+        self.window_clear = 0
+        self.window_total = 0
+        self.head = None  # newest hour held in the ring
+
+    def advance(self, hour):
+        """Move the ring forward so that hour is the newest slot."""
+        if self.head is None:
+            self.head = hour
+            return
+        # Only the slots being reused need clearing, so a long gap costs at
+        # most one pass over the ring
+        for h in range(max(self.head + 1, hour - self.size + 1), hour + 1):
+            slot = h % self.size
+            self.window_clear -= self.clear[slot]
+            self.window_total -= self.total[slot]
+            self.clear[slot] = 0
+            self.total[slot] = 0
+        self.head = max(self.head, hour)
+
+    def add(self, hour, clear, total):
+        self.advance(hour)
+        if hour <= self.head - self.size:
+            return  # older than anything the ring still covers
+        slot = hour % self.size
+        self.clear[slot] += clear
+        self.total[slot] += total
+        self.window_clear += clear
+        self.window_total += total
+
+    def hour_counts(self, hour):
+        if self.head is None or not self.head - self.size < hour <= self.head:
+            return 0, 0
+        slot = hour % self.size
+        return self.clear[slot], self.total[slot]
+
+    def rates(self, current_hour):
+        """
+        (last_hour_rate, baseline_rate, last_hour_total) for the hour before
+        current_hour and the baseline_hours before that. Rates are None when
+        there were no results to rate.
+        """
+        self.advance(current_hour)
+        now_clear, now_total = self.hour_counts(current_hour)
+        last_clear, last_total = self.hour_counts(current_hour - 1)
+        base_clear = self.window_clear - now_clear - last_clear
+        base_total = self.window_total - now_total - last_total
+
+        last_rate = last_clear / last_total if last_total else None
+        base_rate = base_clear / base_total if base_total else None
+        return last_rate, base_rate, last_total
+
+
+class StdoutAlertSink:
+    """Prints alerts as JSON lines, for local runs and testing."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, alert):
+        print(json.dumps(alert), file=self.stream, flush=True)
+
+
+class FileAlertSink:
+    """Appends alerts as JSON lines to a local file, standing in for PagerDuty."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, alert):
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(alert) + '\n')
+
+
+class KYCSubCheckMonitor:
+    """
+    Alert if any sub-check clear rate drops >10% from
+    7-day rolling baseline.
+
+    Any object with a send(alert) method can be used as the sink; alerts are
+    plain dicts with severity, subcheck, hour, current, baseline and reports
+    keys. Reports with no timestamp at all are not recorded; skipped counts
+    the sub-check results dropped that way (one per non-null result, whether
+    they arrive through record, record_report or ingest).
+    """
+
+    def __init__(self, subchecks=None, sink=None, threshold=0.10,
+                 baseline_hours=BASELINE_HOURS, min_reports=20):
+        self.sink = sink or StdoutAlertSink()
+        self.threshold = threshold
+        self.baseline_hours = baseline_hours
+        self.min_reports = min_reports
+        self.rings = {}
+        self.skipped = 0
+        for subcheck in subchecks or []:
+            self.rings[subcheck] = HourlyRing(baseline_hours)
+
+    def _ring(self, subcheck):
+        if subcheck not in self.rings:
+            self.rings[subcheck] = HourlyRing(self.baseline_hours)
+        return self.rings[subcheck]
+
+    def record(self, subcheck, created_at, result):
+        """Record a single sub-check result as it arrives."""
+        if pd.isna(result):
+            return
+        if pd.isna(created_at):
+            self.skipped += 1
+            return
+        self._ring(subcheck).add(epoch_hour(created_at), int(result == 'clear'), 1)
+
+    def record_report(self, report, time_col='created_at_face'):
+        """Record every sub-check result of one merged report (dict or Series)."""
+        created_at = report_times(report, time_col)
+        for subcheck in subcheck_columns(report.keys()):
+            self.record(subcheck, created_at, report[subcheck])
+
+    def ingest(self, df, time_col='created_at_face', check=False):
+        """
+        Record a batch of merged reports, counted per hour in one pass.
+
+        Args:
+            check: Run check_hourly at the top of the hour after each hour
+                is recorded, as the cron job would have.
+
+        Returns:
+            The alerts sent (empty unless check is set).
+        """
+        times = report_times(df, time_col)
+        undated = df.loc[times.isna(), subcheck_columns(df.columns)]
+        self.skipped += int(undated.notna().to_numpy().sum())
+        counts = subcheck_counts(df.assign(report_time=times), 'hour', 'report_time').sort_index()
+        # Plain arrays in sub-check order; per-row Series lookups dominated
+        subchecks = list(counts['total'].columns)
+        rings = [self._ring(subcheck) for subcheck in subchecks]
+        clear = counts['clear'][subchecks].to_numpy(dtype='int64')
+        total = counts['total'][subchecks].to_numpy(dtype='int64')
+        alerts = []
+        for i, period in enumerate(counts.index):
+            hour = epoch_hour(period.start_time)
+            for ring, hour_clear, hour_total in zip(rings, clear[i].tolist(), total[i].tolist()):
+                if hour_total:
+                    ring.add(hour, hour_clear, hour_total)
+            if check:
+                alerts.extend(self.check_hourly(pd.Timestamp((hour + 1) * 3600, unit='s')))
+        return alerts
+
+    def get_last_hour_clear_rate(self, subcheck, now=None):
+        return self._rates(subcheck, now)[0]
+
+    def get_7day_baseline(self, subcheck, now=None):
+        return self._rates(subcheck, now)[1]
+
+    def _rates(self, subcheck, now):
+        now = datetime.now(timezone.utc) if now is None else now
+        return self._ring(subcheck).rates(epoch_hour(now))
+
+    def check_hourly(self, now=None):
+        """
+        Compare the last complete hour with the 7-day baseline for every
+        sub-check and send an alert for each one that dropped by more than
+        the threshold. Hours with fewer than min_reports results are skipped.
+
+        Returns:
+            List of the alerts sent.
+        """
+        now = datetime.now(timezone.utc) if now is None else now
+        hour = epoch_hour(now)
+        alerts = []
+        for subcheck, ring in self.rings.items():
+            current_rate, baseline, current_total = ring.rates(hour)
+            if current_rate is None or baseline is None or current_total < self.min_reports:
+                continue
+
+            if current_rate < (baseline - self.threshold):
+                alert = {
+                    'severity': 'HIGH',
+                    'subcheck': subcheck,
+                    'hour': hour_label(hour - 1),
+                    'current': round(current_rate, 4),
+                    'baseline': round(baseline, 4),
+                    'reports': current_total,
+                }
+                self.sink.send(alert)
+                alerts.append(alert)
+        return alerts
+
+    def replay(self, df, time_col='created_at_face'):
+        """
+        Feed historical merged reports hour by hour and run check_hourly at
+        the top of every following hour, as the cron job would have.
+
+        Returns:
+            All alerts sent during the replay.
+        """
+        return self.ingest(df, time_col, check=True)
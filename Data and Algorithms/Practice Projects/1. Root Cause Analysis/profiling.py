@@ -0,0 +1,300 @@
+# Per-stage timing and memory instrumentation for the analysis pipeline
+#
+# Every measured stage records:
+#   wall_s, cpu_s            elapsed and CPU seconds (CPU of this process only)
+#   rss_mb, peak_rss_mb      resident set size after the stage, and the
+#                            process high-water mark
+#   peak_rss_growth_mb       how far the stage pushed that high-water mark
+#   alloc_peak_mb,           tracemalloc peak and net Python allocations
+#   alloc_net_mb             during the stage (only with trace_memory, which
+#                            slows allocation-heavy code down noticeably)
+#   rows                     rows the stage processed, when given
+# and, with a cProfile directory, dumps <stage>.prof there and keeps the
+# top functions by cumulative time in the record.
+#
+# Records go into a JSON report (build_report / Profiler.finish) and a
+# summary table; compare two reports to spot regressions between runs:
+#
+#     python profiling.py before.json after.json [--threshold 0.2]
+#
+# RSS figures need the resource module and /proc (Linux); elsewhere they are
+# left empty.
+
+import argparse
+import contextlib
+import cProfile
+import datetime
+import json
+import os
+import platform
+import pstats
+import re
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TOP_FUNCTIONS = 10
+MB = 1024 ** 2
+
+
+def rss_mb():
+    """Current resident set size of this process, or None if unknown."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') / MB
+
+
+def peak_rss_mb():
+    """High-water mark of this process's resident set size, or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / MB if sys.platform == 'darwin' else peak / 1024
+
+
+def _round(value, digits=4):
+    return None if value is None else round(value, digits)
+
+
+def _top_functions(profile, limit=TOP_FUNCTIONS):
+    stats = pstats.Stats(profile).stats
+    top = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [{
+        'function': f"{func} ({os.path.basename(filename)}:{line})",
+        'ncalls': ncalls,
+        'tottime_s': round(tottime, 4),
+        'cumtime_s': round(cumtime, 4),
+    } for (filename, line, func), (_, ncalls, tottime, cumtime, _) in top]
+
+
+class Measurement:
+    """Measures one stage between start() and stop()."""
+
+    def __init__(self, name, rows=None, trace_memory=False, cprofile_dir=None):
+        self.name = name
+        self.rows = rows
+        self.trace_memory = trace_memory
+        self.cprofile_dir = cprofile_dir
+        self._profile = None
+        self._started_tracing = False
+
+    def start(self):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            self._alloc_before = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        if self.cprofile_dir:
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Another profiler is already active (e.g. run under cProfile)
+                self._profile = None
+        self._peak_before = peak_rss_mb()
+        self.started = time.perf_counter()
+        self._cpu_before = time.process_time()
+        return self
+
+    def stop(self, rows=None):
+        """Finish the measurement and return its record."""
+        cpu_s = time.process_time() - self._cpu_before
+        wall_s = time.perf_counter() - self.started
+        if self._profile is not None:
+            self._profile.disable()
+
+        peak = peak_rss_mb()
+        record = {
+            'stage': self.name,
+            'wall_s': round(wall_s, 4),
+            'cpu_s': round(cpu_s, 4),
+            'rss_mb': _round(rss_mb(), 1),
+            'peak_rss_mb': _round(peak, 1),
+            'peak_rss_growth_mb': _round(None if peak is None else peak - self._peak_before, 1),
+            'alloc_peak_mb': None,
+            'alloc_net_mb': None,
+            'rows': rows if rows is not None else self.rows,
+            'pid': os.getpid(),
+        }
+        if self.trace_memory:
+            current, peak_alloc = tracemalloc.get_traced_memory()
+            record['alloc_peak_mb'] = round((peak_alloc - self._alloc_before) / MB, 1)
+            record['alloc_net_mb'] = round((current - self._alloc_before) / MB, 1)
+            if self._started_tracing:
+                tracemalloc.stop()
+        if self._profile is not None:
+            os.makedirs(self.cprofile_dir, exist_ok=True)
+            filename = re.sub(r'\W+', '_', self.name).strip('_') + '.prof'
+            record['profile'] = os.path.join(self.cprofile_dir, filename)
+            self._profile.dump_stats(record['profile'])
+            record['top_functions'] = _top_functions(self._profile)
+        return record
+
+
+def measure(func, *args, name=None, rows=None, trace_memory=False, cprofile_dir=None, **kwargs):
+    """
+    Call func(*args, **kwargs) under a Measurement.
+
+    Returns:
+        (result, record). record also carries 'started', the perf_counter
+        value at the start, so callers can line stages up on one clock.
+    """
+    measurement = Measurement(name or func.__name__, rows, trace_memory, cprofile_dir).start()
+    result = func(*args, **kwargs)
+    record = measurement.stop()
+    record['started'] = measurement.started
+    return result, record
+
+
+def summary_table(records):
+    """One row per stage, without the cProfile details."""
+    if not records:
+        return pd.DataFrame()
+    table = pd.DataFrame(records).drop(columns=['profile', 'top_functions', 'started'], errors='ignore')
+    if 'rows' in table:
+        table['rows'] = table['rows'].astype('Int64')
+    return table.set_index('stage').dropna(axis=1, how='all')
+
+
+def build_report(records, total_wall_s=None, **meta):
+    """JSON-serialisable report: run metadata plus one record per stage."""
+    return {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'total_wall_s': total_wall_s,
+        **meta,
+        'stages': [{k: v for k, v in r.items() if k != 'started'} for r in records],
+    }
+
+
+def write_report(path, report):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, default=str)
+
+
+class Profiler:
+    """
+    Collects stage records for a linear script.
+
+    begin() closes the stage in progress (if any) and opens the next, so a
+    script can mark its numbered steps without re-indenting them; stage()
+    is the context-manager form. A disabled profiler does nothing at all.
+    """
+
+    def __init__(self, enabled=True, trace_memory=False, cprofile_dir=None, report_path=None):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.cprofile_dir = cprofile_dir
+        self.report_path = report_path
+        self.records = []
+        self._current = None
+        self._started = time.perf_counter()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Configured from the environment:
+          RCA_PROFILE         JSON report path; profiling is off when unset
+          RCA_TRACE_MEMORY    set to 1 to record tracemalloc figures
+          RCA_CPROFILE_DIR    directory for per-stage cProfile dumps
+        """
+        report_path = os.environ.get('RCA_PROFILE')
+        return cls(
+            enabled=bool(report_path),
+            trace_memory=os.environ.get('RCA_TRACE_MEMORY') == '1',
+            cprofile_dir=os.environ.get('RCA_CPROFILE_DIR'),
+            report_path=report_path,
+        )
+
+    def begin(self, name, rows=None):
+        if not self.enabled:
+            return
+        self.end()
+        self._current = Measurement(name, rows, self.trace_memory, self.cprofile_dir).start()
+
+    def end(self, rows=None):
+        if self._current is None:
+            return
+        self.records.append(self._current.stop(rows))
+        self._current = None
+
+    @contextlib.contextmanager
+    def stage(self, name, rows=None):
+        self.begin(name, rows)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def add(self, records):
+        """Add records measured elsewhere, e.g. in worker processes."""
+        if self.enabled:
+            self.records.extend(records)
+
+    def summary(self):
+        return summary_table(self.records)
+
+    def report(self):
+        return build_report(self.records, round(time.perf_counter() - self._started, 4))
+
+    def finish(self):
+        """End the open stage, write the JSON report and print the summary."""
+        if not self.enabled:
+            return None
+        self.end()
+        if self.report_path:
+            write_report(self.report_path, self.report())
+        print("\nPer-stage profile:")
+        print(self.summary().to_string())
+        if self.report_path:
+            print(f"Profile report written to {self.report_path}")
+        return self.report_path
+
+
+def compare_reports(before, after, threshold=0.2):
+    """
+    Per-stage wall/CPU time and peak memory of two reports side by side.
+    'regression' flags stages whose wall time grew by more than threshold
+    (as a fraction).
+    """
+    columns = ['wall_s', 'cpu_s', 'peak_rss_growth_mb', 'alloc_peak_mb']
+    old = summary_table(before['stages']).reindex(columns=columns)
+    new = summary_table(after['stages']).reindex(columns=columns)
+    table = old.join(new, lsuffix='_before', rsuffix='_after', how='outer')
+    table['wall_change'] = (table['wall_s_after'] / table['wall_s_before'] - 1).round(3)
+    table['regression'] = table['wall_change'] > threshold
+    return table.dropna(axis=1, how='all')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare two profile reports')
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='flag stages whose wall time grew by more than this fraction')
+    args = parser.parse_args()
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    table = compare_reports(before, after, args.threshold)
+    print(table.to_string())
+    regressions = table.index[table['regression']].tolist()
+    print(f"\n{len(regressions)} stages slower by more than {args.threshold:.0%}: {regressions}")
@@ -0,0 +1,207 @@
+# Columnar on-disk cache of parsed report data
+#
+# The first load of a report CSV parses it once, converts every *_result
+# column to a categorical (each only takes a handful of values) and parses
+# created_at to datetime64, then writes the frame to a columnar file next to
+# a small JSON sidecar recording the source file's size and mtime. Later
+# loads read the columnar file directly, and a changed source CSV (different
+# size or mtime) or cache version is treated as a miss and re-cached.
+#
+# user_id and attempt_id are cached both as hex strings and as their 128-bit
+# codes (id_encoding.py); a load reads only the form it returns, so
+# encode_ids=True neither parses nor holds the hex strings. Any other text
+# column with few distinct values (the face reports' properties, mostly
+# '{}') is cached as a categorical.
+#
+# Parquet (via pyarrow) is used when it is installed; otherwise the cache
+# falls back to pandas' pickle format, which keeps the same dtypes.
+
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+
+from id_encoding import code_columns, decode_ids, encode_id_columns, encode_ids
+from kyc_schema import ID_COLUMNS
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+CACHE_VERSION = 2
+DEFAULT_CACHE_DIR = '.rca_cache'
+TIMESTAMP_COLUMNS = ['created_at']
+# Text columns with at most this many distinct values per row are cached
+# as categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _is_result_column(column):
+    return column == 'result' or column.endswith('_result')
+
+
+def parse_reports(df):
+    """
+    Apply the cache's dtypes to a freshly read report frame: categorical
+    result columns and parsed timestamps.
+    """
+    for column in df.columns:
+        if _is_result_column(column):
+            df[column] = df[column].astype('category')
+    for column in TIMESTAMP_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column])
+    return df
+
+
+def _encodes_exactly(values):
+    """Whether the IDs survive the 128-bit round trip (32 lowercase hex)."""
+    try:
+        hi, lo, missing = encode_ids(values)
+    except ValueError:
+        return False
+    return bool((decode_ids(hi, lo)[~missing] == values.to_numpy()[~missing]).all())
+
+
+def to_cached(df):
+    """
+    The frame the cache stores: low-cardinality text as categoricals, and
+    the code columns of every ID column that encodes exactly after it.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if (column not in ID_COLUMNS and pd.api.types.is_string_dtype(df[column])
+                and df[column].nunique() <= len(df) * CATEGORY_MAX_RATIO):
+            df[column] = df[column].astype('category')
+    for column in ID_COLUMNS:
+        if column in df.columns and _encodes_exactly(df[column]):
+            codes = encode_id_columns(df[[column]])
+            position = df.columns.get_loc(column) + 1
+            for offset, name in enumerate(code_columns(column)):
+                df.insert(position + offset, name, codes[name])
+    return df
+
+
+def _unwanted_columns(columns, encode_ids):
+    """The cached ID form a load does not return (codes, or the hex strings)."""
+    unwanted = []
+    for column in ID_COLUMNS:
+        codes = code_columns(column)
+        if column in columns and all(c in columns for c in codes):
+            unwanted += [column] if encode_ids else codes
+    return unwanted
+
+
+def from_cached(df, encode_ids=False):
+    """A cached frame as load_reports returns it: hex IDs, or codes with encode_ids."""
+    df = df.drop(columns=_unwanted_columns(df.columns, encode_ids))
+    return encode_id_columns(df) if encode_ids else df
+
+
+def _read_cached(data_path, encode_ids):
+    if not HAS_PYARROW:
+        return pd.read_pickle(data_path)
+    names = pyarrow.parquet.read_schema(data_path).names
+    unwanted = set(_unwanted_columns(names, encode_ids))
+    return pd.read_parquet(data_path, columns=[c for c in names if c not in unwanted])
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {
+        'version': CACHE_VERSION,
+        'source': os.path.abspath(path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+    }
+
+
+def cache_paths(path, cache_dir=None):
+    """(data file, sidecar file) used to cache the given CSV."""
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), DEFAULT_CACHE_DIR)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    extension = '.parquet' if HAS_PYARROW else '.pkl'
+    return os.path.join(cache_dir, stem + extension), os.path.join(cache_dir, stem + '.meta.json')
+
+
+def _read_signature(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_reports(path, cache_dir=None, refresh=False, encode_ids=False):
+    """
+    Load a report CSV, served from the columnar cache when it is current.
+
+    Args:
+        path: Source CSV.
+        cache_dir: Where cache files live. Defaults to .rca_cache next to
+            the CSV.
+        refresh: Ignore any existing cache and rebuild it.
+        encode_ids: Replace user_id and attempt_id with 128-bit codes
+            (see id_encoding.py), as the cache already stores them.
+
+    Returns:
+        DataFrame with categorical *_result columns and datetime64
+        created_at.
+    """
+    data_path, meta_path = cache_paths(path, cache_dir)
+    signature = _source_signature(path)
+
+    if not refresh and os.path.exists(data_path) and _read_signature(meta_path) == signature:
+        return from_cached(_read_cached(data_path, encode_ids), encode_ids)
+
+    df = to_cached(parse_reports(pd.read_csv(path)))
+
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    # Write the data before the sidecar, so a crash between the two leaves a
+    # stale signature (a miss) rather than a signature pointing at bad data
+    tmp_path = data_path + '.tmp'
+    if HAS_PYARROW:
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_pickle(tmp_path)
+    os.replace(tmp_path, data_path)
+    with open(meta_path, 'w') as f:
+        json.dump(signature, f)
+
+    return from_cached(df, encode_ids)
+
+
+def invalidate(path, cache_dir=None):
+    """Remove the cached copy of a report CSV, if there is one."""
+    for cache_file in cache_paths(path, cache_dir):
+        if os.path.exists(cache_file):
+            os.remove(cache_file)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare raw CSV and cached report loads')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--cache-dir', default=None)
+    args = parser.parse_args()
+
+    for path in args.paths:
+        start = time.perf_counter()
+        raw = pd.read_csv(path)
+        raw['created_at'] = pd.to_datetime(raw['created_at'])
+        raw_s = time.perf_counter() - start
+
+        load_reports(path, args.cache_dir, refresh=True)
+        start = time.perf_counter()
+        cached = load_reports(path, args.cache_dir)
+        cached_s = time.perf_counter() - start
+
+        raw_mb = raw.memory_usage(deep=True).sum() / 1e6
+        cached_mb = cached.memory_usage(deep=True).sum() / 1e6
+        print(f"{path}:")
+        print(f"  CSV + to_datetime: {raw_s:.3f}s, {raw_mb:.1f} MB")
+        print(f"  Cached:            {cached_s:.3f}s, {cached_mb:.1f} MB")
@@ -0,0 +1,200 @@
+# Dependency graph of named analysis stages, run on a process pool
+#
+# Stages are plain module-level functions that take the shared input frame
+# plus the results of the stages they depend on (as keyword arguments named
+# after those stages). Every stage whose dependencies have finished is
+# submitted to the pool straight away, so independent stages run
+# concurrently.
+#
+# The input frame is written once into a multiprocessing SharedMemory block
+# and every worker maps it when it starts, instead of having the frame
+# pickled into each task. With pyarrow installed the block holds an Arrow IPC
+# stream whose buffers workers read in place, but the stages work on pandas,
+# so each worker still converts the table once (to_pandas copies every
+# column into that worker's memory). Without pyarrow the block holds a
+# pickle, which each worker unpickles once. Either way the frame is copied
+# once per worker rather than once per task.
+#
+# Each stage runs under profiling.measure, so the timings table has wall and
+# CPU time, memory and rows for every stage; pass trace_memory=True and/or a
+# cprofile_dir for tracemalloc figures and per-stage cProfile dumps.
+
+import pickle
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+import pandas as pd
+
+from profiling import measure
+
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+class Stage:
+    """A named unit of analysis and the stages whose results it needs."""
+
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, deps={list(self.deps)})"
+
+
+class StageGraph:
+    """Named stages plus their dependencies, checked for cycles on add."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, func, deps=()):
+        if name in self.stages:
+            raise ValueError(f"Stage {name!r} is already defined")
+        missing = [d for d in deps if d not in self.stages]
+        if missing:
+            # Dependencies have to be added first, which also rules out cycles
+            raise ValueError(f"Stage {name!r} depends on undefined stages {missing}")
+        self.stages[name] = Stage(name, func, deps)
+        return self.stages[name]
+
+    def stage(self, name, deps=()):
+        """Decorator form of add()."""
+        def register(func):
+            self.add(name, func, deps)
+            return func
+        return register
+
+
+# Shared input frame -------------------------------------------------------
+
+def share_frame(df):
+    """
+    Copy df into a new SharedMemory block.
+
+    Returns:
+        (SharedMemory, handle). Keep the SharedMemory alive while workers
+        use it and close() / unlink() it afterwards; pass the handle to
+        attach_frame.
+    """
+    if HAS_PYARROW:
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        mock = pa.MockOutputStream()
+        with pa.ipc.new_stream(mock, table.schema) as writer:
+            writer.write_table(table)
+        size = mock.size()
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), table.schema) as writer:
+            writer.write_table(table)
+        return shm, ('arrow', shm.name, size)
+
+    payload = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+    shm = shared_memory.SharedMemory(create=True, size=max(len(payload), 1))
+    shm.buf[:len(payload)] = payload
+    return shm, ('pickle', shm.name, len(payload))
+
+
+def _open_shared(name):
+    # Pool workers share the parent's resource tracker, so on Pythons without
+    # track= the extra registration is harmless; the parent still unlinks
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def attach_frame(handle):
+    """
+    Map a frame shared by share_frame.
+
+    Returns:
+        (SharedMemory, DataFrame). The DataFrame is the worker's own copy;
+        keep the SharedMemory open until it is no longer needed.
+    """
+    kind, name, size = handle
+    shm = _open_shared(name)
+    if kind == 'arrow':
+        table = pa.ipc.open_stream(pa.py_buffer(shm.buf)[:size]).read_all()
+        return shm, table.to_pandas()
+    return shm, pickle.loads(shm.buf[:size])
+
+
+# Process pool execution ---------------------------------------------------
+
+_worker_shm = None
+_worker_frame = None
+
+
+def _init_worker(handle):
+    global _worker_shm, _worker_frame
+    _worker_shm, _worker_frame = attach_frame(handle)
+
+
+def _run_stage(name, func, dep_results, trace_memory, cprofile_dir):
+    return measure(func, _worker_frame, name=name, rows=len(_worker_frame),
+                   trace_memory=trace_memory, cprofile_dir=cprofile_dir, **dep_results)
+
+
+def _timings_frame(records, run_start):
+    for record in records:
+        record['started_at_s'] = round(record.pop('started') - run_start, 4)
+    timings = pd.DataFrame(records).set_index('stage')
+    timings.attrs['total_wall_s'] = round(time.perf_counter() - run_start, 4)
+    timings.attrs['records'] = records
+    return timings
+
+
+def run_graph(graph, frame, max_workers=None, trace_memory=False, cprofile_dir=None):
+    """
+    Run every stage of graph against frame, independent stages concurrently.
+
+    Returns:
+        (results, timings). results maps stage name to its return value;
+        timings is a DataFrame with one row per stage: wall-clock and CPU
+        seconds, memory and rows (see profiling.py), offset from the start
+        of the run, and the worker pid that ran it. timings.attrs['records']
+        holds the same rows for profiling.build_report.
+    """
+    shm, handle = share_frame(frame)
+    results, timings = {}, []
+    run_start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(handle,)) as pool:
+            pending = dict(graph.stages)
+            running = {}
+            while pending or running:
+                ready = [s for s in pending.values() if all(d in results for d in s.deps)]
+                for s in ready:
+                    deps = {d: results[d] for d in s.deps}
+                    future = pool.submit(_run_stage, s.name, s.func, deps, trace_memory, cprofile_dir)
+                    running[future] = s
+                    del pending[s.name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    s = running.pop(future)
+                    results[s.name], record = future.result()
+                    timings.append(record)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return results, _timings_frame(timings, run_start)
+
+
+def run_graph_serial(graph, frame, trace_memory=False, cprofile_dir=None):
+    """Run the same graph in-process, in dependency order (for comparison)."""
+    results, timings = {}, []
+    run_start = time.perf_counter()
+    for s in graph.stages.values():
+        results[s.name], record = measure(s.func, frame, name=s.name, rows=len(frame),
+                                          trace_memory=trace_memory, cprofile_dir=cprofile_dir,
+                                          **{d: results[d] for d in s.deps})
+        timings.append(record)
+    return results, _timings_frame(timings, run_start)
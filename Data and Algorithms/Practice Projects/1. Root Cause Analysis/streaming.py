@@ -0,0 +1,172 @@
+# Streaming mode for the Root Cause Analysis pipeline
+#
+# The main script loads both report files in full and outer-merges them, which
+# holds face_df, doc_df and merged_df in memory at once. Here both files are
+# read in bounded chunks and hash-partitioned on attempt_id into spill files
+# on disk (a grace hash join). Every attempt_id lands in the same bucket on
+# both sides, so each bucket pair can be merged on its own and the result is
+# identical to the full outer merge from step #4. Buckets are sized from the
+# input files, so peak memory stays at roughly one bucket plus one chunk no
+# matter how large the exports get.
+
+import argparse
+import math
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+from kyc_schema import (
+    DOC_REPORTS_CSV,
+    FACE_REPORTS_CSV,
+    MERGE_KEY,
+    MERGE_SUFFIXES,
+    subcheck_columns,
+)
+from subcheck_rates import GRANULARITIES, clear_rates_from_counts, period_key, subcheck_counts
+
+DEFAULT_CHUNKSIZE = 100_000
+DEFAULT_BUCKET_BYTES = 64 * 1024 * 1024
+
+
+def bucket_count(paths, bucket_bytes=DEFAULT_BUCKET_BYTES):
+    """
+    Number of hash buckets needed so that one bucket of every input file
+    fits in roughly bucket_bytes of CSV text.
+    """
+    total = sum(os.path.getsize(p) for p in paths)
+    return max(1, math.ceil(total / bucket_bytes))
+
+
+def partition_reports(path, out_dir, n_buckets, chunksize=DEFAULT_CHUNKSIZE, prefix='part'):
+    """
+    Hash-partition a report CSV on attempt_id into n_buckets spill files.
+
+    Only one chunk of the input is in memory at a time. Every bucket file is
+    created with the header up front, so an empty bucket still reads back as
+    a frame with the right columns.
+
+    Returns:
+        List of bucket file paths, indexed by bucket number.
+    """
+    header = pd.read_csv(path, nrows=0)
+    paths = [os.path.join(out_dir, f'{prefix}_{b:05d}.csv') for b in range(n_buckets)]
+    for p in paths:
+        header.to_csv(p, index=False)
+
+    for chunk in pd.read_csv(path, chunksize=chunksize):
+        buckets = pd.util.hash_pandas_object(chunk[MERGE_KEY], index=False) % n_buckets
+        for b, part in chunk.groupby(buckets.values, sort=False):
+            part.to_csv(paths[b], mode='a', header=False, index=False)
+
+    return paths
+
+
+def stream_merged_reports(face_path=FACE_REPORTS_CSV, doc_path=DOC_REPORTS_CSV,
+                          chunksize=DEFAULT_CHUNKSIZE, bucket_bytes=DEFAULT_BUCKET_BYTES,
+                          tmp_dir=None):
+    """
+    Yield the step #4 outer merge of face and document reports, one bucket
+    at a time.
+
+    The concatenation of every yielded frame has the same rows as
+    pd.merge(face_df, doc_df, on='attempt_id', how='outer'), though not in
+    the same order. Spill files are removed when the generator finishes or
+    is closed.
+    """
+    n_buckets = bucket_count([face_path, doc_path], bucket_bytes)
+    work_dir = tempfile.mkdtemp(prefix='rca_stream_', dir=tmp_dir)
+    try:
+        face_parts = partition_reports(face_path, work_dir, n_buckets, chunksize, prefix='face')
+        doc_parts = partition_reports(doc_path, work_dir, n_buckets, chunksize, prefix='doc')
+
+        for face_part, doc_part in zip(face_parts, doc_parts):
+            face_df = pd.read_csv(face_part)
+            doc_df = pd.read_csv(doc_part)
+            if face_df.empty and doc_df.empty:
+                continue
+            yield pd.merge(face_df, doc_df, on=MERGE_KEY, suffixes=MERGE_SUFFIXES, how='outer')
+            os.remove(face_part)
+            os.remove(doc_part)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+class StreamingAggregates:
+    """
+    Running totals for the monthly pass rate (step #8) and the monthly
+    sub-check clear rates (steps #14 and #17), fed one merged chunk at a time.
+    Periods default to months but take any subcheck_rates granularity.
+
+    Only per-period counts are kept, so memory depends on the number of
+    periods and sub-checks, not on the number of rows.
+    """
+
+    def __init__(self, granularity='month'):
+        self.granularity = granularity
+        self.attempts = pd.DataFrame(columns=['total_attempts', 'passed_attempts'], dtype='int64')
+        self.subcheck = pd.DataFrame(dtype='int64')
+        self.rows = 0
+
+    def update(self, merged_chunk):
+        chunk = merged_chunk
+        passed = (chunk['result_face'] == 'clear') & (chunk['result_doc'] == 'clear')
+        period = period_key(chunk['created_at_face'], self.granularity).rename(self.granularity)
+
+        attempts = pd.DataFrame({
+            'total_attempts': chunk[MERGE_KEY].notna(),
+            'passed_attempts': passed,
+        }).groupby(period).sum()
+        self.attempts = self.attempts.add(attempts, fill_value=0)
+        self.subcheck = self.subcheck.add(
+            subcheck_counts(chunk, self.granularity), fill_value=0)
+
+        self.rows += len(chunk)
+
+    def monthly_stats(self):
+        """Same shape as monthly_stats in step #8."""
+        stats = self.attempts.astype('int64').sort_index()
+        stats['pass_rate'] = (stats['passed_attempts'] / stats['total_attempts']).round(4)
+        stats.index.name = self.granularity
+        return stats
+
+    def subcheck_clear_rates(self):
+        """
+        Clear rate (in %) per period for every sub-check seen so far. A period
+        with no non-null results for a sub-check reports 0, as in step #14.
+        """
+        rates = clear_rates_from_counts(self.subcheck.sort_index())
+        rates = rates[subcheck_columns(rates.columns)]
+        rates.index.name = self.granularity
+        return rates
+
+
+def run_streaming(face_path=FACE_REPORTS_CSV, doc_path=DOC_REPORTS_CSV,
+                  chunksize=DEFAULT_CHUNKSIZE, bucket_bytes=DEFAULT_BUCKET_BYTES, tmp_dir=None,
+                  granularity='month'):
+    """Stream both report files through StreamingAggregates and return it."""
+    aggregates = StreamingAggregates(granularity)
+    for merged_chunk in stream_merged_reports(face_path, doc_path, chunksize, bucket_bytes, tmp_dir):
+        aggregates.update(merged_chunk)
+    return aggregates
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Streaming monthly pass rate and sub-check clear rates')
+    parser.add_argument('--face', default=FACE_REPORTS_CSV)
+    parser.add_argument('--doc', default=DOC_REPORTS_CSV)
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument('--bucket-mb', type=int, default=DEFAULT_BUCKET_BYTES // (1024 * 1024))
+    parser.add_argument('--tmp-dir', default=None)
+    parser.add_argument('--granularity', choices=sorted(GRANULARITIES), default='month')
+    args = parser.parse_args()
+
+    aggregates = run_streaming(args.face, args.doc, args.chunksize,
+                               args.bucket_mb * 1024 * 1024, args.tmp_dir, args.granularity)
+
+    print(f"Merged rows streamed: {aggregates.rows}")
+    print(f"\nPass rate by {args.granularity}:")
+    print(aggregates.monthly_stats())
+    print(f"\nSub-check clear rates by {args.granularity} (%):")
+    print(aggregates.subcheck_clear_rates().round(2).T.to_string())
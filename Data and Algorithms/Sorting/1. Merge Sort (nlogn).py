@@ -1,38 +1,127 @@
+from typing import Callable, List, Optional
+
+
 class Solution:
-    def sortArray(self, nums: List[int]) -> List[int]:
+    def sortArray(self, nums: List[int], key: Optional[Callable] = None) -> List[int]:
+        # Bottom-up (non-recursive) natural merge sort.
+        #  - the input is first cut into its natural runs: ascending runs are
+        #    kept, strictly descending ones are reversed in place, and short
+        #    runs are extended to MIN_RUN with insertion sort. Already sorted
+        #    data is a single run and is done after one O(n) scan.
+        #  - runs are then merged pairwise, pass after pass, between the
+        #    input and ONE auxiliary buffer allocated up front (plus one for
+        #    the values when key= is used): each pass reads from one and
+        #    writes to the other, so no slices are made.
+        #  - merges take from the left run on ties, so the sort is stable.
+        #    With key=, keys are computed once per element, and a tuple key
+        #    such as key=lambda r: (r['user_id'], r['created_at']) gives a
+        #    stable multi-key sort.
 
-        def merge(arr, L, M, R):
-            left, right = arr[L:M+1], arr[M+1:R+1]
-            i, j, k = L, 0, 0
+        MIN_RUN = 32
+        n = len(nums)
+        if n < 2:
+            return nums
 
-            while j < len(left) and k < len(right):
-                if left[j] <= right[k]:
-                    arr[i] = left[j]
-                    j += 1
+        keys = nums if key is None else [key(x) for x in nums]
+        vals = None if key is None else nums
+
+        def reverse(arr, lo, hi):
+            hi -= 1
+            while lo < hi:
+                arr[lo], arr[hi] = arr[hi], arr[lo]
+                lo += 1
+                hi -= 1
+
+        def insertionSort(lo, start, hi):
+            # keys[lo:start] is already sorted; insert keys[start:hi] into it
+            for i in range(start, hi):
+                k = keys[i]
+                v = vals[i] if vals is not None else None
+                j = i - 1
+                while j >= lo and keys[j] > k:
+                    keys[j + 1] = keys[j]
+                    if vals is not None:
+                        vals[j + 1] = vals[j]
+                    j -= 1
+                keys[j + 1] = k
+                if vals is not None:
+                    vals[j + 1] = v
+
+        def findRuns():
+            runs = [0]
+            lo = 0
+            while lo < n:
+                hi = lo + 1
+                if hi < n and keys[hi] < keys[lo]:
+                    # Strictly descending, so reversing it keeps stability
+                    while hi < n and keys[hi] < keys[hi - 1]:
+                        hi += 1
+                    reverse(keys, lo, hi)
+                    if vals is not None:
+                        reverse(vals, lo, hi)
                 else:
-                    arr[i] = right[k]
-                    k += 1
-                i += 1
+                    while hi < n and keys[hi] >= keys[hi - 1]:
+                        hi += 1
+                if hi - lo < MIN_RUN:
+                    end = min(lo + MIN_RUN, n)
+                    insertionSort(lo, hi, end)
+                    hi = end
+                runs.append(hi)
+                lo = hi
+            return runs
 
-            while j < len(left):
-                nums[i] = left[j]
-                j += 1
-                i += 1
-            while k < len(right):
-                nums[i] = right[k]
-                k += 1
-                i += 1
+        def merge(src_k, src_v, dst_k, dst_v, lo, mid, hi):
+            i, j, out = lo, mid, lo
+            while i < mid and j < hi:
+                if src_k[j] < src_k[i]:
+                    dst_k[out] = src_k[j]
+                    if src_v is not None:
+                        dst_v[out] = src_v[j]
+                    j += 1
+                else:
+                    dst_k[out] = src_k[i]
+                    if src_v is not None:
+                        dst_v[out] = src_v[i]
+                    i += 1
+                out += 1
+            # Exactly one side has leftovers; copy them across
+            if i < mid:
+                copy(src_k, src_v, dst_k, dst_v, i, mid, out)
+            else:
+                copy(src_k, src_v, dst_k, dst_v, j, hi, out)
 
-        def mergeSort(arr, l, r):
-            if l == r:
-                return arr
+        def copy(src_k, src_v, dst_k, dst_v, lo, hi, out):
+            # Element by element, so no temporary slice is allocated
+            for i in range(lo, hi):
+                dst_k[out] = src_k[i]
+                if src_v is not None:
+                    dst_v[out] = src_v[i]
+                out += 1
 
-            m = (l + r) // 2
-            mergeSort(arr, l, m,)
-            mergeSort(arr, m+1, r)
-            merge(arr, l, m, r)
-            return arr
+        runs = findRuns()
+        if len(runs) == 2:
+            return nums if vals is None else vals
 
+        src_k, dst_k = keys, [None] * n
+        src_v, dst_v = vals, (None if vals is None else [None] * n)
 
-        return mergeSort(nums, 0, len(nums)-1)
+        while len(runs) > 2:
+            merged = [0]
+            for r in range(0, len(runs) - 1, 2):
+                lo = runs[r]
+                if r + 2 < len(runs):
+                    mid, hi = runs[r + 1], runs[r + 2]
+                    merge(src_k, src_v, dst_k, dst_v, lo, mid, hi)
+                else:
+                    # Odd run out: carry it over to the other buffer
+                    hi = runs[r + 1]
+                    copy(src_k, src_v, dst_k, dst_v, lo, hi, lo)
+                merged.append(hi)
+            runs = merged
+            src_k, dst_k = dst_k, src_k
+            src_v, dst_v = dst_v, src_v
 
+        result = src_k if vals is None else src_v
+        if result is not nums:
+            nums[:] = result
+        return nums
@@ -1,23 +1,113 @@
+from typing import List
+
+
 class Solution:
     def sortArray(self, nums: List[int]) -> List[int]:
+        # Introsort: quicksort with a guaranteed O(n log n) worst case.
+        #  - median-of-three pivot (ninther on large ranges) so sorted and
+        #    reverse-sorted input split evenly
+        #  - three-way partitioning, so runs of equal keys are finished in
+        #    one pass instead of recursing on them
+        #  - insertion sort on small ranges, where it beats partitioning
+        #  - heap sort on any range that is still unsorted after
+        #    2 * log2(n) levels of partitioning
+        # Recursion only happens on the smaller side of each partition and
+        # the larger side is handled by the loop, so the stack never grows
+        # past log2(n) frames.
+
+        SMALL = 16
+        NINTHER = 128
+
+        def insertionSort(arr, low, high):
+            for i in range(low + 1, high + 1):
+                key = arr[i]
+                j = i - 1
+                while j >= low and arr[j] > key:
+                    arr[j + 1] = arr[j]
+                    j -= 1
+                arr[j + 1] = key
+
+        def siftDown(arr, low, start, end):
+            # Max-heap over arr[low:end], with root offset `low`
+            root = start
+            while True:
+                child = 2 * (root - low) + 1 + low
+                if child >= end:
+                    return
+                if child + 1 < end and arr[child] < arr[child + 1]:
+                    child += 1
+                if arr[root] >= arr[child]:
+                    return
+                arr[root], arr[child] = arr[child], arr[root]
+                root = child
+
+        def heapSort(arr, low, high):
+            end = high + 1
+            n = end - low
+            for start in range(low + n // 2 - 1, low - 1, -1):
+                siftDown(arr, low, start, end)
+            for last in range(end - 1, low, -1):
+                arr[low], arr[last] = arr[last], arr[low]
+                siftDown(arr, low, low, last)
+
+        def medianOfThree(arr, a, b, c):
+            x, y, z = arr[a], arr[b], arr[c]
+            if x < y:
+                if y < z:
+                    return y
+                return z if x < z else x
+            if x < z:
+                return x
+            return z if y < z else y
+
+        def choosePivot(arr, low, high):
+            mid = (low + high) // 2
+            if high - low + 1 < NINTHER:
+                return medianOfThree(arr, low, mid, high)
+            # Tukey's ninther: median of three medians-of-three
+            step = (high - low + 1) // 8
+            return sorted([
+                medianOfThree(arr, low, low + step, low + 2 * step),
+                medianOfThree(arr, mid - step, mid, mid + step),
+                medianOfThree(arr, high - 2 * step, high - step, high),
+            ])[1]
+
+        def partition(arr, low, high):
+            # Dutch national flag: arr[low:lt] < pivot, arr[lt:gt+1] == pivot,
+            # arr[gt+1:high+1] > pivot
+            pivot = choosePivot(arr, low, high)
+            lt, i, gt = low, low, high
+            while i <= gt:
+                if arr[i] < pivot:
+                    arr[lt], arr[i] = arr[i], arr[lt]
+                    lt += 1
+                    i += 1
+                elif arr[i] > pivot:
+                    arr[i], arr[gt] = arr[gt], arr[i]
+                    gt -= 1
+                else:
+                    i += 1
+            return lt, gt
 
-        def partition (arr, low, high):
-            pivot = arr[high]
-            i = low - 1
+        def introSort(arr, low, high, depth):
+            while high - low + 1 > SMALL:
+                if depth == 0:
+                    heapSort(arr, low, high)
+                    return
+                depth -= 1
 
-            for j in range (low, high):
-                if arr[j] <= pivot:
-                    i+=1
-                    arr[i], arr[j] = arr[j], arr[i]
+                lt, gt = partition(arr, low, high)
 
-            arr[i+1], arr[high] = arr[high], arr [i+1]
-            return i + 1
+                # Recurse on the smaller side, loop on the larger
+                if lt - low < high - gt:
+                    introSort(arr, low, lt - 1, depth)
+                    low = gt + 1
+                else:
+                    introSort(arr, gt + 1, high, depth)
+                    high = lt - 1
 
-        def quickSort(arr, low, high):
-            if low < high:
-                pi = partition(arr, low, high)
-                quickSort(arr, low, pi - 1)
-                quickSort(arr, pi + 1, high)
-            return arr
+            insertionSort(arr, low, high)
 
-        return quickSort(nums, 0, len(nums) - 1)
\ No newline at end of file
+        if len(nums) > 1:
+            introSort(nums, 0, len(nums) - 1, 2 * (len(nums).bit_length()))
+        return nums
@@ -1,35 +1,184 @@
-class Solution:
-    def sortArray(self, nums: List[int]) -> List[int]:
+from typing import Any, Callable, Iterable, List, Optional
+
+# Binary heaps, built from the heap sort below.
+#  - sift_down is iterative, so deep heaps cannot hit the recursion limit
+#  - heapify uses Floyd's bottom-up construction: sift down every internal
+#    node from the last one to the root, O(n) in total
+#  - Heap is a priority queue over arbitrary items with an optional key
+#  - top_k keeps only k items in memory however long the input stream is
+#
+# Load it with sort_loader.load_module('3. Heap Sort (nlogn).py').
+
+
+def sift_down(arr, start, end):
+    """Restore the max-heap property of arr[:end] below position start."""
+    root = start
+    item = arr[root]
+    while True:
+        child = 2 * root + 1
+        if child >= end:
+            break
+        # Pick the larger child
+        if child + 1 < end and arr[child + 1] > arr[child]:
+            child += 1
+        if not arr[child] > item:
+            break
+        arr[root] = arr[child]  # move the child up, fill the hole later
+        root = child
+    arr[root] = item
+
+
+def heapify(arr):
+    """Turn arr into a max-heap in place, in O(n) (Floyd's method)."""
+    n = len(arr)
+    for i in range(n // 2 - 1, -1, -1):
+        sift_down(arr, i, n)
+
+
+class Heap:
+    """
+    Priority queue. pop() returns the smallest item by key, or the largest
+    with max_heap=True; items with equal keys come out in insertion order.
+    """
+
+    def __init__(self, items: Iterable = (), key: Optional[Callable] = None, max_heap: bool = False):
+        self.key = key or (lambda x: x)
+        self.max_heap = max_heap
+        self._seq = 0
+        self._entries = []
+        for item in items:
+            self._entries.append(self._entry(item))
+        for i in range(len(self._entries) // 2 - 1, -1, -1):
+            self._sift_down(i)
+
+    def _entry(self, item):
+        self._seq += 1
+        return (self.key(item), self._seq, item)
+
+    def _before(self, a, b):
+        if a[0] == b[0]:
+            return a[1] < b[1]
+        return a[0] > b[0] if self.max_heap else a[0] < b[0]
+
+    def _sift_down(self, root):
+        entries, n = self._entries, len(self._entries)
+        entry = entries[root]
+        while True:
+            child = 2 * root + 1
+            if child >= n:
+                break
+            if child + 1 < n and self._before(entries[child + 1], entries[child]):
+                child += 1
+            if not self._before(entries[child], entry):
+                break
+            entries[root] = entries[child]
+            root = child
+        entries[root] = entry
+
+    def _sift_up(self, pos):
+        entries = self._entries
+        entry = entries[pos]
+        while pos > 0:
+            parent = (pos - 1) // 2
+            if not self._before(entry, entries[parent]):
+                break
+            entries[pos] = entries[parent]
+            pos = parent
+        entries[pos] = entry
 
-        def heapify(arr, n, i):
-            largest = i
-            left = 2 * i + 1
-            right = 2 * i + 2
+    def push(self, item):
+        self._entries.append(self._entry(item))
+        self._sift_up(len(self._entries) - 1)
 
-            #If left child exists and is greater than the root
-            if left < n and arr[left] < arr[largest]:
-                largest = left
+    def peek(self):
+        if not self._entries:
+            raise IndexError('peek from an empty heap')
+        return self._entries[0][2]
 
-            #If right child exists and is greater than current largest
-            if right < n and arr[right] > arr[largest]:
-                largest = right
+    def pop(self):
+        if not self._entries:
+            raise IndexError('pop from an empty heap')
+        last = self._entries.pop()
+        if not self._entries:
+            return last[2]
+        top = self._entries[0]
+        self._entries[0] = last
+        self._sift_down(0)
+        return top[2]
 
-            #If largest is not root
-            if largest != i:
-                arr[i], arr[largest] = arr[largest], arr[i]
-                heapify(arr, n, largest)
+    def replace(self, item):
+        """Pop and return the top, then push item, with a single sift."""
+        if not self._entries:
+            raise IndexError('replace on an empty heap')
+        top = self._entries[0]
+        self._entries[0] = self._entry(item)
+        self._sift_down(0)
+        return top[2]
+
+    def pushpop(self, item):
+        """Push item, then pop and return the top; cheaper than the two calls."""
+        entry = self._entry(item)
+        if not self._entries or self._before(entry, self._entries[0]):
+            return item
+        top = self._entries[0]
+        self._entries[0] = entry
+        self._sift_down(0)
+        return top[2]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+
+def top_k(iterable: Iterable, k: int, key: Optional[Callable] = None, largest: bool = True) -> List[Any]:
+    """
+    The k largest items of iterable (k smallest with largest=False), best
+    first, in one pass with O(k) memory and O(N log k) time. Items with
+    equal keys keep their input order.
+
+    The current top k sit in a heap whose root is the weakest of them, so
+    each new item only costs one comparison unless it beats that root.
+    """
+    if k <= 0:
+        return []
+    key = key or (lambda x: x)
+
+    # Entries are (key, position, item), ranked so that the heap's root is
+    # the entry that would be evicted first: the worst key, and on ties the
+    # later item
+    if largest:
+        heap = Heap(key=lambda e: (e[0], -e[1]))
+    else:
+        heap = Heap(key=lambda e: (e[0], e[1]), max_heap=True)
+
+    for position, item in enumerate(iterable):
+        entry = (key(item), position, item)
+        if len(heap) < k:
+            heap.push(entry)
+        else:
+            heap.pushpop(entry)
+
+    # Popping yields the weakest first
+    best = [heap.pop()[2] for _ in range(len(heap))]
+    best.reverse()
+    return best
+
+
+class Solution:
+    def sortArray(self, nums: List[int]) -> List[int]:
 
         def heapSort(arr):
             n = len(arr)
 
             #Build max heap
-            for i in range(n // 2 - 1, -1, -1):
-                heapify(arr, n, i)
+            heapify(arr)
 
             #One by one extract elements
             for i in range(n - 1, 0, -1):
                 arr[0], arr[i] = arr[i], arr[0] #Move max to the end
-                heapify(arr, i, 0) #Heapify reduced heap
+                sift_down(arr, 0, i) #Heapify reduced heap
 
             return arr
 
@@ -0,0 +1,173 @@
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+
+from sort_loader import load_module
+
+# External k-way merge sort, for CSV files larger than memory.
+#  - run generation: the file is cut into byte ranges that end on line
+#    boundaries, each small enough to sort in memory. Worker processes read
+#    their own range, sort it with the merge sort from file 1 and spill it to
+#    a temporary run file, so only the ranges themselves cross processes.
+#  - k-way merge: one buffered reader per run, with the head row of each run
+#    in the Heap from file 3. Every output row costs one replace(), i.e. one
+#    sift of a heap with at most k entries, so the merge is O(N log k).
+#  - equal keys keep their input order: the heap breaks ties by run number,
+#    and runs are numbered in file order.
+#
+# memory_bytes bounds the raw CSV bytes held at once across all workers; a
+# parsed row takes a few times its size on disk, so leave headroom.
+#
+# Rows must not contain embedded newlines, since ranges are split on them.
+# Keys are compared as strings, which sorts ISO timestamps such as
+# created_at correctly, unless key_type (e.g. float) is given; it must be
+# picklable, so a module-level function rather than a lambda.
+#
+# Usage: python "4. External Merge Sort.py" input.csv output.csv --key created_at
+
+MergeSort = load_module('1. Merge Sort (nlogn).py').Solution
+Heap = load_module('3. Heap Sort (nlogn).py').Heap
+
+DEFAULT_MEMORY_BYTES = 256 * 1024 ** 2
+BUFFER_BYTES = 1024 ** 2
+
+
+def split_ranges(path: str, chunk_bytes: int) -> List[tuple]:
+    """(start, end) byte ranges of the data rows, each about chunk_bytes and ending on a newline."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        f.readline()  # header
+        start = f.tell()
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def sort_range(path: str, start: int, end: int, key_index: int, key_type: Optional[Callable],
+               run_path: str) -> int:
+    """Sort one byte range of path into run_path; returns the number of rows."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        lines = f.read(end - start).decode('utf-8').splitlines()
+    # Blank lines (e.g. a trailing one) parse as [], which has no key
+    rows = [row for row in csv.reader(lines) if row]
+    if key_type is None:
+        MergeSort().sortArray(rows, key=lambda r: r[key_index])
+    else:
+        MergeSort().sortArray(rows, key=lambda r: key_type(r[key_index]))
+    with open(run_path, 'w', newline='', encoding='utf-8', buffering=BUFFER_BYTES) as out:
+        csv.writer(out).writerows(rows)
+    return len(rows)
+
+
+def merge_runs(run_paths: List[str], header: List[str], output_path: str, key_index: int,
+               key_type: Optional[Callable] = None) -> int:
+    """Stream the sorted runs into output_path in one pass; returns the number of rows."""
+    convert = key_type or (lambda v: v)
+    files = [open(p, newline='', encoding='utf-8', buffering=BUFFER_BYTES) for p in run_paths]
+    try:
+        readers = [csv.reader(f) for f in files]
+        heads = []
+        for run, reader in enumerate(readers):
+            row = next(reader, None)
+            if row is not None:
+                heads.append((convert(row[key_index]), run, row))
+        heap = Heap(heads, key=lambda e: (e[0], e[1]))
+
+        rows = 0
+        with open(output_path, 'w', newline='', encoding='utf-8', buffering=BUFFER_BYTES) as out:
+            writer = csv.writer(out)
+            writer.writerow(header)
+            while heap:
+                _, run, row = heap.peek()
+                writer.writerow(row)
+                rows += 1
+                nxt = next(readers[run], None)
+                if nxt is None:
+                    heap.pop()
+                else:
+                    heap.replace((convert(nxt[key_index]), run, nxt))
+    finally:
+        for f in files:
+            f.close()
+    return rows
+
+
+def external_sort(input_path: str, output_path: str, key: str, key_type: Optional[Callable] = None,
+                  memory_bytes: int = DEFAULT_MEMORY_BYTES, workers: Optional[int] = None,
+                  tmp_dir: Optional[str] = None) -> dict:
+    """
+    Sort input_path by the column `key` into output_path.
+
+    Returns row count, run count and timings, with throughput in rows/sec
+    for each phase and overall.
+    """
+    workers = workers or os.cpu_count() or 1
+    with open(input_path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    if key not in header:
+        raise KeyError(f"column {key!r} not in {input_path}")
+    key_index = header.index(key)
+
+    start = time.perf_counter()
+    ranges = split_ranges(input_path, max(1, memory_bytes // workers))
+    run_dir = tempfile.mkdtemp(prefix='extsort_', dir=tmp_dir)
+    try:
+        run_paths = [os.path.join(run_dir, f'run_{i:05d}.csv') for i in range(len(ranges))]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(sort_range, input_path, lo, hi, key_index, key_type, run_path)
+                       for (lo, hi), run_path in zip(ranges, run_paths)]
+            sorted_rows = sum(f.result() for f in futures)
+        split_s = time.perf_counter() - start
+
+        merge_start = time.perf_counter()
+        merged_rows = merge_runs(run_paths, header, output_path, key_index, key_type)
+        merge_s = time.perf_counter() - merge_start
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+    if merged_rows != sorted_rows:
+        raise RuntimeError(f'merged {merged_rows} rows but sorted {sorted_rows}')
+    total_s = time.perf_counter() - start
+    return {
+        'rows': merged_rows,
+        'runs': len(run_paths),
+        'workers': workers,
+        'split_s': split_s,
+        'merge_s': merge_s,
+        'total_s': total_s,
+        'split_rows_per_s': merged_rows / split_s if split_s else float('inf'),
+        'merge_rows_per_s': merged_rows / merge_s if merge_s else float('inf'),
+        'rows_per_s': merged_rows / total_s if total_s else float('inf'),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Sort a CSV larger than memory by one column')
+    parser.add_argument('input')
+    parser.add_argument('output')
+    parser.add_argument('--key', required=True, help='column to sort by')
+    parser.add_argument('--numeric', action='store_true', help='compare keys as numbers, not strings')
+    parser.add_argument('--memory-mb', type=float, default=DEFAULT_MEMORY_BYTES / 1024 ** 2,
+                        help='raw CSV bytes held in memory at once, across all workers')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--tmp-dir', default=None, help='where to spill the sorted runs')
+    args = parser.parse_args()
+
+    stats = external_sort(args.input, args.output, args.key, float if args.numeric else None,
+                          int(args.memory_mb * 1024 ** 2), args.workers, args.tmp_dir)
+    print(f"{stats['rows']:,} rows in {stats['runs']} runs with {stats['workers']} workers")
+    print(f"  split + sort: {stats['split_s']:.2f}s ({stats['split_rows_per_s']:,.0f} rows/s)")
+    print(f"  k-way merge:  {stats['merge_s']:.2f}s ({stats['merge_rows_per_s']:,.0f} rows/s)")
+    print(f"  total:        {stats['total_s']:.2f}s ({stats['rows_per_s']:,.0f} rows/s)")
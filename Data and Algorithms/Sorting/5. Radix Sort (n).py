@@ -0,0 +1,120 @@
+from typing import List, Union
+import array
+
+import numpy as np
+
+# Radix sort over typed buffers (NumPy arrays, array.array), for numeric keys.
+# Nothing here creates a Python int per element: keys stay in the buffer.
+#  - keys are first mapped to uint64 in an order-preserving way (signed ints
+#    get their sign bit flipped, floats the usual IEEE bit trick), and the
+#    minimum is subtracted so only the bits that actually vary are sorted on.
+#    Epoch-second timestamps over a year span about 25 bits: two passes.
+#  - small ranges (codes, counts, anything with span up to COUNTING_MAX or
+#    about n) are counting sorted: one bincount and one repeat.
+#  - otherwise LSD radix sort, 16 bits per pass. Each pass is a stable
+#    counting sort of one uint16 digit; NumPy's kind='stable' sort on 16-bit
+#    data is itself a counting/radix sort, so every pass is O(n) in C.
+#  - argsort mode returns the stable permutation instead of moving the
+#    keys, e.g. to reorder a whole DataFrame:
+#        df.take(radix_argsort(df['created_at'].values))
+#    (NaT is the smallest int64, so it sorts first, unlike sort_values.)
+#
+# Load it with sort_loader.load_module('5. Radix Sort (n).py').
+
+DIGIT_BITS = 16
+COUNTING_MAX = 1 << 16
+
+SIGN_BIT = np.uint64(1 << 63)
+
+
+def as_array(nums) -> np.ndarray:
+    """A NumPy view of an array.array or buffer; writing to it writes through."""
+    if isinstance(nums, np.ndarray):
+        return nums
+    if isinstance(nums, array.array):
+        return np.frombuffer(nums, dtype=nums.typecode)
+    return np.asarray(nums)
+
+
+def ordered_keys(keys: np.ndarray) -> np.ndarray:
+    """uint64 keys whose unsigned order matches the numeric order of keys."""
+    if keys.dtype.kind in 'mM':
+        keys = keys.view(np.int64)
+    if keys.dtype.kind == 'b':
+        return keys.astype(np.uint64)
+    if keys.dtype.kind == 'u':
+        return keys.astype(np.uint64, copy=False)
+    if keys.dtype.kind == 'i':
+        return keys.astype(np.int64, copy=False).view(np.uint64) ^ SIGN_BIT
+    if keys.dtype.kind == 'f':
+        bits = keys.astype(np.float64).view(np.uint64)
+        # Negative floats: flip every bit; positive: flip just the sign bit
+        return np.where(bits & SIGN_BIT, ~bits, bits | SIGN_BIT)
+    raise TypeError(f'radix sort needs numeric keys, not {keys.dtype}')
+
+
+def radix_argsort(keys) -> np.ndarray:
+    """Stable permutation that sorts keys, in O(n * passes)."""
+    keys = as_array(keys)
+    n = len(keys)
+    if n < 2:
+        return np.arange(n, dtype=np.intp)
+
+    ukeys = ordered_keys(keys)
+    lo = ukeys.min()
+    span = int(ukeys.max() - lo)
+    if span == 0:
+        return np.arange(n, dtype=np.intp)
+    ukeys = ukeys - lo
+
+    perm = None
+    mask = np.uint64((1 << DIGIT_BITS) - 1)
+    for shift in range(0, span.bit_length(), DIGIT_BITS):
+        current = ukeys if perm is None else ukeys[perm]
+        digit = ((current >> np.uint64(shift)) & mask).astype(np.uint16)
+        order = np.argsort(digit, kind='stable')
+        perm = order if perm is None else perm[order]
+    return perm
+
+
+def radix_sort(nums):
+    """Sort a NumPy array or array.array of numbers in place; returns it."""
+    arr = as_array(nums)
+    n = len(arr)
+    if n < 2:
+        return nums
+
+    if arr.dtype.kind in 'iu':
+        # Offsets are taken in the uint64 key space, so int8 etc. cannot wrap
+        ukeys = ordered_keys(arr)
+        lo = ukeys.min()
+        span = int(ukeys.max() - lo)
+        if span <= max(COUNTING_MAX, n):
+            counts = np.bincount((ukeys - lo).astype(np.intp), minlength=span + 1)
+            values = np.arange(span + 1, dtype=np.uint64) + lo
+            if arr.dtype.kind == 'i':
+                values = (values ^ SIGN_BIT).view(np.int64)
+            arr[:] = np.repeat(values.astype(arr.dtype), counts)
+            return nums
+
+    arr[:] = arr[radix_argsort(arr)]
+    return nums
+
+
+class Solution:
+    def sortArray(self, nums: Union[List[int], array.array, np.ndarray],
+                  argsort: bool = False) -> Union[List[int], array.array, np.ndarray]:
+        # Typed buffers are sorted in place. A Python list is copied into an
+        # array of its natural dtype (int64, or float64 if any element is a
+        # float) once, sorted there and written back, so it still works
+        # (e.g. in benchmark.py) but pays for boxing on the way in and out.
+        if argsort:
+            return radix_argsort(nums)
+        if isinstance(nums, list):
+            arr = np.asarray(nums)
+            if arr.dtype.kind not in 'biuf':
+                raise TypeError(f'radix sort needs numeric keys, not {arr.dtype}')
+            radix_sort(arr)
+            nums[:] = arr.tolist()
+            return nums
+        return radix_sort(nums)
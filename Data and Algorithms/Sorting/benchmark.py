@@ -0,0 +1,118 @@
+# Benchmark every Solution.sortArray in this folder against sorted()
+#
+# Each numbered file that defines Solution is timed on every input size and
+# distribution, its output is checked against sorted(), and the results are
+# printed as one comparison table. An implementation that raises (e.g.
+# RecursionError) is reported as such. Once a run takes longer than
+# --budget seconds, larger sizes of the same distribution are skipped for
+# that implementation rather than left to run for hours.
+#
+# Usage: python benchmark.py [--sizes 1000 10000 100000 1000000] [--repeat 3]
+
+import argparse
+import random
+import time
+
+from sort_loader import load_solutions
+
+DEFAULT_SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+
+
+def random_ints(n, rng):
+    return [rng.randrange(n * 10) for _ in range(n)]
+
+
+def already_sorted(n, rng):
+    return sorted(random_ints(n, rng))
+
+
+def reverse_sorted(n, rng):
+    return sorted(random_ints(n, rng), reverse=True)
+
+
+def many_duplicates(n, rng):
+    return [rng.randrange(10) for _ in range(n)]
+
+
+def nearly_sorted(n, rng):
+    """Sorted, then about 1% of positions swapped with a random partner."""
+    data = already_sorted(n, rng)
+    for _ in range(max(1, n // 100)):
+        i, j = rng.randrange(n), rng.randrange(n)
+        data[i], data[j] = data[j], data[i]
+    return data
+
+
+DISTRIBUTIONS = {
+    'random': random_ints,
+    'sorted': already_sorted,
+    'reverse': reverse_sorted,
+    'duplicates': many_duplicates,
+    'nearly_sorted': nearly_sorted,
+}
+
+
+def time_sort(sort, data, repeat):
+    """Best of `repeat` runs on fresh copies, plus the last output."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        arr = list(data)
+        start = time.perf_counter()
+        result = sort(arr)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(sizes, distributions, repeat=1, budget=30.0, seed=0):
+    sorts = {'sorted()': sorted}
+    sorts.update({name: solution.sortArray for name, solution in load_solutions().items()})
+
+    rows = []
+    for dist_name in distributions:
+        too_slow = set()
+        for n in sizes:
+            data = DISTRIBUTIONS[dist_name](n, random.Random(seed))
+            expected = sorted(data)
+            for name, sort in sorts.items():
+                row = {'distribution': dist_name, 'n': n, 'algorithm': name}
+                if name in too_slow:
+                    row['status'] = 'skipped'
+                else:
+                    try:
+                        seconds, result = time_sort(sort, data, repeat)
+                    except Exception as e:
+                        row['status'] = type(e).__name__
+                    else:
+                        row['seconds'] = seconds
+                        row['status'] = 'ok' if result == expected else 'WRONG'
+                        if seconds > budget:
+                            too_slow.add(name)
+                rows.append(row)
+    return rows
+
+
+def print_table(rows):
+    baseline = {(r['distribution'], r['n']): r['seconds'] for r in rows if r['algorithm'] == 'sorted()'}
+    header = f"{'distribution':<14}{'n':>10}  {'algorithm':<14}{'seconds':>10}{'x sorted()':>12}  status"
+    print(header)
+    print('-' * len(header))
+    for r in rows:
+        if 'seconds' in r:
+            ratio = r['seconds'] / baseline[(r['distribution'], r['n'])]
+            timing = f"{r['seconds']:>10.4f}{ratio:>12.1f}"
+        else:
+            timing = f"{'-':>10}{'-':>12}"
+        print(f"{r['distribution']:<14}{r['n']:>10,}  {r['algorithm']:<14}{timing}  {r['status']}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the sorting implementations')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--distributions', nargs='+', choices=list(DISTRIBUTIONS), default=list(DISTRIBUTIONS))
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--budget', type=float, default=30.0,
+                        help='skip larger sizes after a run slower than this many seconds')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print_table(run(args.sizes, args.distributions, args.repeat, args.budget, args.seed))
@@ -0,0 +1,47 @@
+# Helpers for importing the numbered sorting files
+#
+# Files like "1. Merge Sort (nlogn).py" are not valid module names, so they
+# are loaded by path instead of with a plain import.
+
+import glob
+import importlib.util
+import os
+import re
+import sys
+
+SORTING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_module(filename):
+    """Import a file from this folder by name, e.g. '1. Merge Sort (nlogn).py'."""
+    path = os.path.join(SORTING_DIR, filename)
+    name = re.sub(r'\W+', '_', os.path.splitext(filename)[0]).strip('_').lower()
+    module_name = f'sorting_{name}'
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so functions from it can be pickled into worker processes
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def numbered_files():
+    """Every "N. Name.py" file in this folder, in number order."""
+    paths = glob.glob(os.path.join(SORTING_DIR, '[0-9]*. *.py'))
+    return sorted((os.path.basename(p) for p in paths), key=lambda f: int(f.split('.')[0]))
+
+
+def load_solutions():
+    """
+    Map a short display name (the file name without number and complexity)
+    to a Solution instance, for every numbered file that defines one.
+    """
+    solutions = {}
+    for filename in numbered_files():
+        module = load_module(filename)
+        if hasattr(module, 'Solution'):
+            name = re.sub(r'^\d+\.\s*|\s*\(.*\)\.py$|\.py$', '', filename)
+            solutions[name] = module.Solution()
+    return solutions